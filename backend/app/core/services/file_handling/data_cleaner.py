@@ -2,6 +2,7 @@
 Data Cleaner Service - Specialized in cleaning and preprocessing data
 Single responsibility: Clean and preprocess DataFrames
 """
+import numpy as np
 import pandas as pd
 from typing import Tuple, List, Dict, Any
 
@@ -33,32 +34,36 @@ class DataCleaner:
         """
         Handle unnamed columns by giving them descriptive names
         """
-        df_copy = df.copy()
         unnamed_columns_info = {
             'found_unnamed': False,
             'renamed_columns': [],
-            'original_count': len(df_copy.columns)
+            'original_count': len(df.columns)
         }
         
         # Find columns that are unnamed (typically start with 'Unnamed:')
+        column_labels = df.columns.astype(str)
+        unnamed_mask = column_labels.str.startswith('Unnamed:') | column_labels.isin(['', ' ', 'nan'])
+        
+        # Only the column labels change, so build the new labels without copying data
+        new_columns = list(df.columns)
         renamed_columns = []
-        for i, col in enumerate(df_copy.columns):
-            col_str = str(col)
-            if col_str.startswith('Unnamed:') or col_str in ['', ' ', 'nan']:
-                new_name = f"Sin_Nombre_{i+1}"
-                df_copy = df_copy.rename(columns={col: new_name})
-                renamed_columns.append({
-                    'original': col_str,
-                    'new_name': new_name,
-                    'position': i+1
-                })
+        for i in np.flatnonzero(unnamed_mask):
+            i = int(i)
+            new_name = f"Sin_Nombre_{i+1}"
+            new_columns[i] = new_name
+            renamed_columns.append({
+                'original': column_labels[i],
+                'new_name': new_name,
+                'position': i+1
+            })
         
         if renamed_columns:
+            df = df.set_axis(pd.Index(new_columns), axis=1, copy=False)
             unnamed_columns_info['found_unnamed'] = True
             unnamed_columns_info['renamed_columns'] = renamed_columns
             print(f"🏷️  Renamed {len(renamed_columns)} unnamed columns")
         
-        return df_copy, unnamed_columns_info
+        return df, unnamed_columns_info
     
     def _remove_empty_columns(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
         """
@@ -66,12 +71,12 @@ class DataCleaner:
         This preserves the original structure so users can see all columns.
         Returns: (DataFrame unchanged, list of empty column names)
         """
-        df_copy = df.copy()
+        # Only reads the columns, so the DataFrame is returned as is (no full copy)
         empty_columns = []
 
-        for col in df_copy.columns:
+        for col in df.columns:
             # Get the column as string to handle mixed types
-            col_series = df_copy[col].astype(str)
+            col_series = df[col].astype(str)
 
             # Check if column is completely empty or only contains whitespace/null indicators
             is_empty = col_series.isna().all() or \
@@ -85,4 +90,4 @@ class DataCleaner:
             print(f"⚠️  Found {len(empty_columns)} empty columns (preserved): {empty_columns}")
 
         # Return DataFrame unchanged with list of empty columns
-        return df_copy, empty_columns
\ No newline at end of file
+        return df, empty_columns
\ No newline at end of file
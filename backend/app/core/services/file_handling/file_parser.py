@@ -4,8 +4,17 @@ Single responsibility: Convert files to pandas DataFrames
 """
 import pandas as pd
 import os
+import csv
+import codecs
 from typing import Optional
 
+# Optional Rust-based Excel reader; falls back to openpyxl (xlsx) / xlrd (xls)
+try:
+    import python_calamine  # noqa: F401
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
 
 class FileParser:
     """
@@ -24,9 +33,68 @@ class FileParser:
         else:
             raise ValueError(f"Unsupported file format: {file_extension}")
     
+    ENCODINGS_TO_TRY = ['utf-8', 'latin1', 'cp1252', 'iso-8859-1']
+    
+    # Bytes read per step when checking an encoding
+    ENCODING_CHECK_CHUNK_SIZE = 1024 * 1024
+    
     def _parse_csv(self, file_path: str) -> pd.DataFrame:
         """Parse CSV/TXT file with automatic encoding and separator detection"""
-        encodings_to_try = ['utf-8', 'latin1', 'cp1252', 'iso-8859-1']
+        # Detect encoding and separator up front so the file is parsed once
+        encoding = self._detect_encoding(file_path)
+        if encoding:
+            sep = self._detect_separator(file_path, encoding)
+            try:
+                df = pd.read_csv(file_path, encoding=encoding, sep=sep)
+                
+                if len(df.columns) >= 1 and len(df) > 0:
+                    print(f"✅ CSV parsed successfully with encoding: {encoding}, separator: {sep}")
+                    
+                    # If file was not UTF-8, convert and save it as UTF-8
+                    if encoding != 'utf-8':
+                        self._convert_file_to_utf8(file_path, encoding)
+                        print(f"🔄 File converted from {encoding} to UTF-8")
+                    
+                    return df
+            except Exception:
+                pass
+        
+        # Fallback: try every encoding/separator combination
+        return self._parse_csv_exhaustive(file_path)
+    
+    def _detect_encoding(self, file_path: str) -> Optional[str]:
+        """Return the first candidate encoding that decodes the whole file"""
+        for encoding in self.ENCODINGS_TO_TRY:
+            if self._decodes_as(file_path, encoding):
+                return encoding
+        
+        return None
+    
+    def _decodes_as(self, file_path: str, encoding: str) -> bool:
+        """Check that the file decodes with encoding, reading it in chunks (no full copy in memory)"""
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(self.ENCODING_CHECK_CHUNK_SIZE), b''):
+                    decoder.decode(chunk)
+            decoder.decode(b'', final=True)
+            return True
+        except UnicodeDecodeError:
+            return False
+    
+    def _detect_separator(self, file_path: str, encoding: str) -> str:
+        """Sniff the separator from the first line, as pandas does for sep=None"""
+        with open(file_path, 'r', encoding=encoding, newline='') as f:
+            first_line = f.readline()
+        
+        try:
+            return csv.Sniffer().sniff(first_line).delimiter
+        except csv.Error:
+            return ','
+    
+    def _parse_csv_exhaustive(self, file_path: str) -> pd.DataFrame:
+        """Parse CSV/TXT file trying every encoding and separator combination"""
+        encodings_to_try = self.ENCODINGS_TO_TRY
         separators_to_try = [None, ',', ';', '\t', '|']  # None lets pandas infer
         
         for encoding in encodings_to_try:
@@ -63,7 +131,7 @@ class FileParser:
         """Parse Excel file with optional sheet selection"""
         try:
             # Read Excel file - may return dict for multi-sheet files
-            result = pd.read_excel(file_path, sheet_name=sheet_name)
+            result = self._read_excel(file_path, sheet_name)
             
             # Handle multi-sheet Excel files
             if isinstance(result, dict):
@@ -112,6 +180,19 @@ class FileParser:
             else:
                 raise Exception(f"Error al leer archivo Excel: {error_msg}")
     
+    def _read_excel(self, file_path: str, sheet_name: Optional[str] = None):
+        """Read Excel with calamine when available, otherwise pandas' default engine"""
+        if CALAMINE_AVAILABLE:
+            try:
+                return pd.read_excel(file_path, sheet_name=sheet_name, engine='calamine')
+            except ValueError:
+                # Missing sheet: the default engine would fail the same way
+                raise
+            except Exception as e:
+                print(f"⚠️  calamine could not read Excel file, retrying with default engine: {str(e)}")
+        
+        return pd.read_excel(file_path, sheet_name=sheet_name)
+    
     def _convert_file_to_utf8(self, file_path: str, source_encoding: str) -> None:
         """Convert file from source encoding to UTF-8"""
         try:
@@ -3,6 +3,7 @@ File Upload Service - Core Infrastructure
 Provides secure file upload, parsing, and validation capabilities for all ToolKits
 """
 import os
+import hashlib
 import pandas as pd
 import openpyxl
 from typing import List, Optional, Dict, Any, Tuple
@@ -29,6 +30,8 @@ class FileUploadService:
     
     ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls', 'txt'}
     MAX_FILE_SIZE = 1 * 1024 * 1024 * 1024  # 1GB
+    SAMPLE_SCAN_ROWS = 1000  # Rows inspected to collect column sample values
+    SAVE_CHUNK_SIZE = 1024 * 1024  # 1MB chunks when streaming uploads to disk
     
     def __init__(self, upload_folder: str):
         self.upload_folder = upload_folder
@@ -88,12 +91,14 @@ class FileUploadService:
             unique_filename = f"{uuid.uuid4().hex}.{file_extension}"
             file_path = os.path.join(self.upload_folder, unique_filename)
             
-            # Save file temporarily for security scanning
-            file.save(file_path)
+            # Save file temporarily for security scanning, hashing and sizing it while it is written
+            file_hash, written_size = self._save_with_hash(file, file_path)
             
             # SECURITY: Comprehensive security scan
             print(f"🔍 Performing security scan on: {original_filename}")
-            security_result = self.security_validator.validate_file_comprehensive(file_path)
+            security_result = self.security_validator.validate_file_comprehensive(
+                file_path, file_hash=file_hash, file_size=written_size
+            )
             
             if not security_result.is_safe:
                 # Remove unsafe file immediately
@@ -153,6 +158,22 @@ class FileUploadService:
                 'error_code': 'UPLOAD_ERROR'
             }
     
+    def _save_with_hash(self, file: FileStorage, file_path: str) -> Tuple[str, int]:
+        """
+        Save uploaded file to disk and return its SHA-256 hash and size in bytes
+        
+        Hash and size are computed from the same chunks that are written, so the
+        security scan does not need to read or stat the file again.
+        """
+        sha256_hash = hashlib.sha256()
+        written_size = 0
+        with open(file_path, 'wb') as out:
+            for chunk in iter(lambda: file.stream.read(self.SAVE_CHUNK_SIZE), b""):
+                sha256_hash.update(chunk)
+                out.write(chunk)
+                written_size += len(chunk)
+        return sha256_hash.hexdigest(), written_size
+    
     def get_sheet_names(self, file_path: str) -> List[str]:
         """
         Get sheet names from Excel file
@@ -206,14 +227,14 @@ class FileUploadService:
             # Get sample values for each column (first 5 non-null values)
             sample_values = {}
             for col in columns:
-                non_null_values = df[col].dropna().astype(str).unique()[:5]
-                sample_values[col] = non_null_values.tolist()
+                sample_values[col] = self._get_sample_values(df[col])
             
             # Basic statistics (convert numpy types to native Python types)
             stats = {
                 'total_rows': int(len(df)),
                 'total_columns': int(len(columns)),
-                'empty_cells': int(df.isnull().sum().sum()),
+                # Cells minus per-column non-null counts: avoids building an N×M boolean mask
+                'empty_cells': int(df.size - df.count().sum()),
                 'memory_usage': int(df.memory_usage(deep=True).sum())
             }
             
@@ -234,6 +255,20 @@ class FileUploadService:
                 'error_code': 'PARSE_ERROR'
             }
     
+    def _get_sample_values(self, series: pd.Series, limit: int = 5) -> List[str]:
+        """
+        First `limit` distinct non-null values of a column, as strings
+        
+        Looks at the first SAMPLE_SCAN_ROWS rows only; the full column is
+        scanned just when that head holds fewer than `limit` distinct values.
+        """
+        # Stringify before deduplicating: values that compare equal but print differently
+        # (1, '1' and 1.0) must stay distinct samples
+        head_values = series.iloc[:self.SAMPLE_SCAN_ROWS].dropna().astype(str).unique()
+        if len(head_values) >= limit or len(series) <= self.SAMPLE_SCAN_ROWS:
+            return head_values[:limit].tolist()
+        
+        return series.dropna().astype(str).unique()[:limit].tolist()
     
     def get_data_preview(self, file_path: str, sheet_name: Optional[str] = None, 
                         start_row: int = 0, rows_per_page: int = 10) -> Dict[str, Any]:
@@ -277,10 +312,11 @@ class FileUploadService:
     def get_file_info(self, file_path: str) -> Dict[str, Any]:
         """Get basic file information"""
         try:
-            if not os.path.exists(file_path):
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
                 raise FileNotFoundError(f"Archivo no encontrado: {file_path}")
             
-            stat = os.stat(file_path)
             file_extension = file_path.lower().split('.')[-1]
             
             info = {
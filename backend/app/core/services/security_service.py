@@ -13,8 +13,12 @@ except ImportError:
 
 import zipfile
 import os
+import copy
+import struct
 import hashlib
-from typing import Dict, Any, List, Optional
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
 
 # Session Authorization Services  
@@ -72,6 +76,30 @@ class FileSecurityValidator:
     # Maximum allowed file size (16MB by default)
     MAX_FILE_SIZE = 16 * 1024 * 1024
     
+    # Lowercase substrings of ZIP member names that indicate VBA content
+    # ('vba' also covers 'vbaProject', 'macro' also covers 'macros')
+    MACRO_NAME_TOKENS = ('macro', 'vba', 'module')
+    
+    # ZIP structures used to read member names from the central directory
+    ZIP_EOCD_SIGNATURE = b'PK\x05\x06'
+    ZIP_EOCD_FORMAT = '<4s4H2LH'
+    ZIP_EOCD_SIZE = 22
+    ZIP_CD_SIGNATURE = b'PK\x01\x02'
+    ZIP_CD_HEADER_SIZE = 46
+    ZIP64_LOCATOR_SIGNATURE = b'PK\x06\x07'
+    ZIP64_LOCATOR_SIZE = 20
+    
+    # Scan results cache: (file_size, extension, sha256) -> SecurityScanResult
+    # Results are a pure function of the file bytes and extension, so entries never go stale
+    SCAN_CACHE_SIZE = 4096
+    _scan_cache: 'OrderedDict[Tuple[int, str, str], SecurityScanResult]' = OrderedDict()
+    _scan_cache_lock = threading.Lock()
+    
+    # Shared libmagic handle: the module-level magic.from_file() builds a new Magic
+    # object (reloading the magic database) on every call. Magic is not thread-safe.
+    _magic = None
+    _magic_lock = threading.Lock()
+    
     def __init__(self, max_file_size: int = None):
         """
         Initialize file security validator
@@ -83,18 +111,42 @@ class FileSecurityValidator:
         
         # Test if python-magic is working
         try:
-            magic.from_buffer(b"test", mime=True)
+            self._magic_from_buffer(b"test")
             self.magic_available = True
         except Exception:
             self.magic_available = False
             print("⚠️  python-magic not available - file type detection will be limited")
     
-    def validate_file_comprehensive(self, file_path: str) -> SecurityScanResult:
+    @classmethod
+    def _get_magic(cls):
+        """Create the shared Magic instance on first use (caller holds _magic_lock)"""
+        if cls._magic is None:
+            cls._magic = magic.Magic(mime=True)
+        return cls._magic
+    
+    @classmethod
+    def _magic_from_buffer(cls, buffer: bytes) -> str:
+        """Detect MIME type of a buffer with the shared Magic instance"""
+        with cls._magic_lock:
+            return cls._get_magic().from_buffer(buffer)
+    
+    @classmethod
+    def _magic_from_file(cls, file_path: str) -> str:
+        """Detect MIME type of a file with the shared Magic instance"""
+        with cls._magic_lock:
+            return cls._get_magic().from_file(file_path)
+    
+    def validate_file_comprehensive(self, file_path: str, file_hash: Optional[str] = None,
+                                    file_size: Optional[int] = None) -> SecurityScanResult:
         """
         Perform comprehensive security validation of a file
         
         Args:
             file_path: Path to the file to validate
+            file_hash: SHA-256 of the file if already known (e.g. computed while
+                saving the upload); skips re-reading the file to hash it
+            file_size: Size in bytes if already known (e.g. counted while saving
+                the upload); skips the stat call
             
         Returns:
             SecurityScanResult: Detailed scan results
@@ -104,19 +156,20 @@ class FileSecurityValidator:
         scan_details = {}
         
         try:
-            # Check if file exists and is readable
-            if not os.path.exists(file_path):
-                return SecurityScanResult(
-                    is_safe=False,
-                    detected_type="unknown",
-                    file_size=0,
-                    warnings=[],
-                    errors=["File does not exist"],
-                    scan_details={}
-                )
+            # Check if file exists and get its size with a single stat call
+            if file_size is None:
+                try:
+                    file_size = os.stat(file_path).st_size
+                except FileNotFoundError:
+                    return SecurityScanResult(
+                        is_safe=False,
+                        detected_type="unknown",
+                        file_size=0,
+                        warnings=[],
+                        errors=["File does not exist"],
+                        scan_details={}
+                    )
             
-            # Get file size
-            file_size = os.path.getsize(file_path)
             scan_details['file_size'] = file_size
             
             # Validate file size
@@ -142,69 +195,154 @@ class FileSecurityValidator:
                     scan_details=scan_details
                 )
             
-            # Detect MIME type
-            mime_type = self._detect_mime_type(file_path)
-            scan_details['detected_mime_type'] = mime_type
+            # Calculate file hash for integrity (also the key for the scan cache)
+            if file_hash is None:
+                file_hash = self._calculate_file_hash(file_path)
             
-            # Validate MIME type
-            if mime_type not in self.ALLOWED_MIME_TYPES:
-                errors.append(f"File type not allowed: {mime_type}")
-                return SecurityScanResult(
-                    is_safe=False,
-                    detected_type=mime_type,
-                    file_size=file_size,
-                    warnings=warnings,
-                    errors=errors,
-                    scan_details=scan_details
-                )
+            cache_key = (file_size, os.path.splitext(file_path.lower())[1], file_hash)
             
-            # Scan for macros in Office files
-            macro_scan = self._scan_for_macros(file_path, mime_type)
-            scan_details['macro_scan'] = macro_scan
+            cached_result = self._get_cached_result(cache_key)
+            if cached_result is not None:
+                return cached_result
             
-            if macro_scan.get('has_macros'):
-                errors.append("File contains macros - BLOCKED for security")
-                return SecurityScanResult(
-                    is_safe=False,
-                    detected_type=mime_type,
-                    file_size=file_size,
-                    warnings=warnings,
-                    errors=errors,
-                    scan_details=scan_details
-                )
+            mime_type, macro_scan = self._detect_type_and_macros(file_path)
             
-            # Scan for suspicious content
-            content_scan = self._scan_file_content(file_path)
-            scan_details['content_scan'] = content_scan
+            result = self._run_content_checks(file_path, file_size, file_hash, mime_type, macro_scan, scan_details)
+            self._store_cached_result(cache_key, result)
+            return result
             
-            if content_scan.get('suspicious_patterns_found', 0) > 0:
-                warnings.append(f"Found {content_scan['suspicious_patterns_found']} suspicious patterns")
-                # This is a warning, not an error - might be false positive
+        except Exception as e:
+            errors.append(f"Security scan error: {str(e)}")
+            return SecurityScanResult(
+                is_safe=False,
+                detected_type="error",
+                file_size=file_size if 'file_size' in locals() else 0,
+                warnings=warnings,
+                errors=errors,
+                scan_details=scan_details
+            )
+    
+    def _detect_type_and_macros(self, file_path: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Detect MIME type and, for allowed types, scan for macros
+        
+        Args:
+            file_path: Path to the file to validate
             
-            # Calculate file hash for integrity
-            file_hash = self._calculate_file_hash(file_path)
-            scan_details['file_hash_sha256'] = file_hash
+        Returns:
+            Tuple: (MIME type, macro scan results or None if the type is not allowed)
+        """
+        mime_type = self._detect_mime_type(file_path)
+        macro_scan = None
+        if mime_type in self.ALLOWED_MIME_TYPES:
+            macro_scan = self._scan_for_macros(file_path, mime_type)
+        
+        return mime_type, macro_scan
+    
+    def _run_content_checks(self, file_path: str, file_size: int, file_hash: str, mime_type: str,
+                            macro_scan: Optional[Dict[str, Any]], scan_details: Dict[str, Any]) -> SecurityScanResult:
+        """
+        Evaluate the content-dependent checks (MIME type, macros, suspicious patterns)
+        
+        Args:
+            file_path: Path to the file to validate
+            file_size: File size in bytes
+            file_hash: SHA-256 hash of the file
+            mime_type: Detected MIME type
+            macro_scan: Macro scan results (None if the MIME type is not allowed)
+            scan_details: Scan details collected so far
             
-            # If we get here, file passed all security checks
+        Returns:
+            SecurityScanResult: Detailed scan results
+        """
+        warnings = []
+        errors = []
+        
+        scan_details['detected_mime_type'] = mime_type
+        
+        # Validate MIME type
+        if mime_type not in self.ALLOWED_MIME_TYPES:
+            errors.append(f"File type not allowed: {mime_type}")
             return SecurityScanResult(
-                is_safe=True,
+                is_safe=False,
                 detected_type=mime_type,
                 file_size=file_size,
                 warnings=warnings,
-                errors=[],
+                errors=errors,
                 scan_details=scan_details
             )
-            
-        except Exception as e:
-            errors.append(f"Security scan error: {str(e)}")
+        
+        # Macros in Office files
+        scan_details['macro_scan'] = macro_scan
+        
+        if macro_scan.get('has_macros'):
+            errors.append("File contains macros - BLOCKED for security")
             return SecurityScanResult(
                 is_safe=False,
-                detected_type="error",
-                file_size=file_size if 'file_size' in locals() else 0,
+                detected_type=mime_type,
+                file_size=file_size,
                 warnings=warnings,
                 errors=errors,
                 scan_details=scan_details
             )
+        
+        # Scan for suspicious content
+        content_scan = self._scan_file_content(file_path)
+        scan_details['content_scan'] = content_scan
+        
+        if content_scan.get('suspicious_patterns_found', 0) > 0:
+            warnings.append(f"Found {content_scan['suspicious_patterns_found']} suspicious patterns")
+            # This is a warning, not an error - might be false positive
+        
+        scan_details['file_hash_sha256'] = file_hash
+        
+        # If we get here, file passed all security checks
+        return SecurityScanResult(
+            is_safe=True,
+            detected_type=mime_type,
+            file_size=file_size,
+            warnings=warnings,
+            errors=[],
+            scan_details=scan_details
+        )
+    
+    def _get_cached_result(self, cache_key: Tuple[int, str, str]) -> Optional[SecurityScanResult]:
+        """
+        Look up a previous scan result for identical file contents
+        
+        Args:
+            cache_key: (file_size, extension, sha256) of the file
+            
+        Returns:
+            SecurityScanResult copy or None if the file was not scanned before
+        """
+        if cache_key[2] == "error":
+            return None
+        
+        with self._scan_cache_lock:
+            cached = self._scan_cache.get(cache_key)
+            if cached is None:
+                return None
+            self._scan_cache.move_to_end(cache_key)
+        
+        return copy.deepcopy(cached)
+    
+    def _store_cached_result(self, cache_key: Tuple[int, str, str], result: SecurityScanResult) -> None:
+        """
+        Store a scan result, evicting the least recently used entry when full
+        
+        Args:
+            cache_key: (file_size, extension, sha256) of the file
+            result: Scan result to cache
+        """
+        if cache_key[2] == "error":
+            return
+        
+        with self._scan_cache_lock:
+            self._scan_cache[cache_key] = copy.deepcopy(result)
+            self._scan_cache.move_to_end(cache_key)
+            while len(self._scan_cache) > self.SCAN_CACHE_SIZE:
+                self._scan_cache.popitem(last=False)
     
     def _detect_mime_type(self, file_path: str) -> str:
         """
@@ -218,7 +356,7 @@ class FileSecurityValidator:
         """
         try:
             if self.magic_available:
-                mime_type = magic.from_file(file_path, mime=True)
+                mime_type = self._magic_from_file(file_path)
                 
                 # Handle common magic issues with XLSX files
                 if mime_type == 'application/zip' or 'zip' in mime_type.lower():
@@ -335,18 +473,25 @@ class FileSecurityValidator:
                 if file_path.lower().endswith('.xlsx'):
                     # Modern Excel files are ZIP archives
                     try:
-                        with zipfile.ZipFile(file_path, 'r') as zip_file:
+                        member_names = self._read_zip_member_names(file_path)
+                        lower_names = '\n'.join(member_names).lower()
+                        
+                        # Single pass over all names; only clean files are common,
+                        # so per-file matching runs just when something was found
+                        if any(token in lower_names for token in self.MACRO_NAME_TOKENS):
+                            lower_list = [f.lower() for f in member_names]
+                            
                             # Look for VBA project files
-                            vba_files = [f for f in zip_file.namelist() 
-                                       if 'vbaProject' in f or 'macros' in f.lower()]
+                            vba_files = [f for f, lower in zip(member_names, lower_list)
+                                       if 'vbaProject' in f or 'macros' in lower]
                             
                             if vba_files:
                                 scan_result['has_macros'] = True
                                 scan_result['macro_files_found'] = vba_files
                             
                             # Also check for suspicious file names in the ZIP
-                            suspicious_files = [f for f in zip_file.namelist()
-                                              if any(susp in f.lower() for susp in ['macro', 'vba', 'module'])]
+                            suspicious_files = [f for f, lower in zip(member_names, lower_list)
+                                              if any(susp in lower for susp in self.MACRO_NAME_TOKENS)]
                             
                             if suspicious_files and not scan_result['has_macros']:
                                 scan_result['has_macros'] = True
@@ -380,6 +525,110 @@ class FileSecurityValidator:
         
         return scan_result
     
+    def _read_zip_member_names(self, file_path: str) -> List[str]:
+        """
+        Read member names from a ZIP archive
+        
+        Tries the central directory fast path first and falls back to zipfile
+        whenever it cannot parse the archive, so a file that zipfile (and
+        therefore openpyxl) can open is never reported as unreadable.
+        
+        Args:
+            file_path: Path to ZIP file
+            
+        Returns:
+            List[str]: Member names in central directory order
+            
+        Raises:
+            zipfile.BadZipFile: If the file is not a valid ZIP archive
+        """
+        try:
+            return self._read_central_directory_names(file_path)
+        except Exception:
+            with zipfile.ZipFile(file_path, 'r') as zip_file:
+                return zip_file.namelist()
+    
+    def _read_central_directory_names(self, file_path: str) -> List[str]:
+        """
+        Read member names straight from the ZIP central directory
+        
+        Only the End Of Central Directory record and the central directory are
+        read, with two positional reads on one descriptor. Offsets are corrected
+        for data prepended to the archive and the whole central directory is
+        walked, as zipfile does. ZIP64 archives raise so the caller uses zipfile.
+        
+        Args:
+            file_path: Path to ZIP file
+            
+        Returns:
+            List[str]: Member names in central directory order
+            
+        Raises:
+            zipfile.BadZipFile: If the archive cannot be read this way
+        """
+        fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            file_size = os.fstat(fd).st_size
+            
+            # EOCD is at most 22 bytes + 64KB comment from the end of the file
+            tail_size = min(file_size, self.ZIP_EOCD_SIZE + 0xFFFF)
+            tail = self._pread(fd, tail_size, file_size - tail_size)
+            
+            eocd_pos = tail.rfind(self.ZIP_EOCD_SIGNATURE)
+            if eocd_pos < 0 or len(tail) - eocd_pos < self.ZIP_EOCD_SIZE:
+                raise zipfile.BadZipFile('End of central directory not found')
+            
+            # A ZIP64 locator right before the EOCD overrides its fields
+            eocd_offset = file_size - tail_size + eocd_pos
+            locator_pos = eocd_pos - self.ZIP64_LOCATOR_SIZE
+            if eocd_offset >= self.ZIP64_LOCATOR_SIZE and (
+                locator_pos < 0 or tail[locator_pos:locator_pos + 4] == self.ZIP64_LOCATOR_SIGNATURE
+            ):
+                raise zipfile.BadZipFile('ZIP64 archive')
+            
+            (_, _, _, _, _, cd_size, cd_offset, _) = struct.unpack(
+                self.ZIP_EOCD_FORMAT, tail[eocd_pos:eocd_pos + self.ZIP_EOCD_SIZE]
+            )
+            
+            # Bytes prepended to the archive shift every offset (zipfile allows this)
+            concat = eocd_offset - cd_size - cd_offset
+            if concat < 0:
+                raise zipfile.BadZipFile('Bad central directory offset')
+            
+            central_directory = self._pread(fd, cd_size, cd_offset + concat)
+        finally:
+            os.close(fd)
+        
+        if len(central_directory) != cd_size:
+            raise zipfile.BadZipFile('Truncated central directory')
+        
+        # Walk every entry in the directory (not the EOCD entry count), as zipfile does
+        names = []
+        pos = 0
+        while pos < cd_size:
+            header = central_directory[pos:pos + self.ZIP_CD_HEADER_SIZE]
+            if len(header) < self.ZIP_CD_HEADER_SIZE or header[:4] != self.ZIP_CD_SIGNATURE:
+                raise zipfile.BadZipFile('Invalid central directory entry')
+            
+            flags, = struct.unpack_from('<H', header, 8)
+            name_len, extra_len, comment_len = struct.unpack_from('<3H', header, 28)
+            
+            raw_name = central_directory[pos + self.ZIP_CD_HEADER_SIZE:pos + self.ZIP_CD_HEADER_SIZE + name_len]
+            # Bit 11 marks UTF-8 names, otherwise the ZIP spec mandates cp437
+            names.append(raw_name.decode('utf-8' if flags & 0x800 else 'cp437', errors='replace'))
+            
+            pos += self.ZIP_CD_HEADER_SIZE + name_len + extra_len + comment_len
+        
+        return names
+    
+    @staticmethod
+    def _pread(fd: int, size: int, offset: int) -> bytes:
+        """Read `size` bytes at `offset` without moving a file pointer (seek+read where pread is missing)"""
+        if hasattr(os, 'pread'):
+            return os.pread(fd, size, offset)
+        os.lseek(fd, offset, os.SEEK_SET)
+        return os.read(fd, size)
+    
     def _scan_file_content(self, file_path: str) -> Dict[str, Any]:
         """
         Scan file content for suspicious patterns
@@ -1,14 +1,31 @@
 # Tools Module - Plugin Architecture Core
 # Factory for dispatching to appropriate ToolKit implementations
 
-from .ensamblaje_tool import EnsamblajeToolKit
+from importlib import import_module
+
+# Registro de herramientas: metadatos disponibles sin importar el ToolKit; la clase
+# (validator, exporters y sus dependencias) se importa recién en el primer get_toolkit
+_TOOLKITS = {
+    'ensamblaje': {
+        'class_path': '.ensamblaje_tool:EnsamblajeToolKit',
+        'name': 'Validador - Ensamblajes',
+        'description': 'Herramienta para validación de bases de datos de ensamblaje'
+    }
+}
+
+def _load_toolkit_class(tool_name: str):
+    """
+    Importar la clase del ToolKit registrado (import_module cachea el módulo tras el primer uso)
+    """
+    module_path, class_name = _TOOLKITS[tool_name]['class_path'].split(':')
+    return getattr(import_module(module_path, __name__), class_name)
 
 def get_toolkit(tool_name: str, session_id: str):
     """
     Fábrica simple para crear ToolKits específicos
     """
-    if tool_name == 'ensamblaje':
-        return EnsamblajeToolKit(session_id)
+    if tool_name in _TOOLKITS:
+        return _load_toolkit_class(tool_name)(session_id)
     else:
         raise ValueError(f"ToolKit '{tool_name}' no encontrado")
 
@@ -17,10 +34,14 @@ def get_available_tools():
     Lista de herramientas disponibles
     """
     return {
-        'ensamblaje': {
-            'name': 'Validador - Ensamblajes',
-            'description': 'Herramienta para validación de bases de datos de ensamblaje'
-        }
+        tool_name: {'name': entry['name'], 'description': entry['description']}
+        for tool_name, entry in _TOOLKITS.items()
     }
 
-__all__ = ['EnsamblajeToolKit', 'get_toolkit', 'get_available_tools']
\ No newline at end of file
+def __getattr__(name: str):
+    # from app.tools import EnsamblajeToolKit sigue funcionando, importando la clase al acceder
+    if name == 'EnsamblajeToolKit':
+        return _load_toolkit_class('ensamblaje')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = ['EnsamblajeToolKit', 'get_toolkit', 'get_available_tools']
@@ -3,38 +3,72 @@ Check reutilizable para detección de duplicados
 Puede ser usado por cualquier herramienta (ensamblaje, respuestas, etc.)
 """
 import pandas as pd
-from typing import Dict, List
-from ...core.models import VariableCategorization, DuplicateValidationResult, DuplicateItem
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from ...core.models import VariableCategorization, DuplicateValidationResult
+from .instrument_groups import (
+    SINGLE_INSTRUMENT_KEY, get_present_instrument_vars, format_instrument_key, get_instrument_positions
+)
 
 # Constantes para instrumento único
-SINGLE_INSTRUMENT_KEY = "default_instrument"
 SINGLE_INSTRUMENT_DISPLAY = "Toda la base de datos"
 
+# Hasta este número de filas los conteos por valor usan np.unique (menos overhead que value_counts)
+NP_UNIQUE_MAX_ROWS = 1_000
+
 def _analyze_id_variable_by_instrument(data: pd.DataFrame, variable: str) -> Dict[str, any]:
     """
     Analiza una variable ID mostrando únicos, repetidos y faltantes
     """
-    # Contar valores no nulos
-    non_null_data = data[variable].dropna()
-    value_counts = non_null_data.value_counts()
+    column = data[variable]
+    total_observations = len(column)
     
-    # Contar valores faltantes
-    missing_count = data[variable].isnull().sum()
-    total_observations = len(data)
+    # Un solo conteo por valor (incluye faltantes); el resto de estadísticas sale de máscaras sobre los conteos
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # Contar sobre los códigos enteros (-1 = faltante), solo categorías presentes y en orden de
+        # primera aparición (como value_counts sobre texto, para que los empates salgan en el mismo orden).
+        # Se renumeran los códigos del instrumento para que el conteo no dependa del total de categorías
+        codes = column.cat.codes.to_numpy()
+        valid_codes = codes[codes >= 0]
+        missing_count = total_observations - len(valid_codes)
+        local_codes, present_codes = pd.factorize(valid_codes)
+        counts = np.bincount(local_codes, minlength=len(present_codes))
+        value_counts = pd.Series(counts, index=column.cat.categories[present_codes])
+    else:
+        value_counts = None
+        if total_observations <= NP_UNIQUE_MAX_ROWS:
+            # Instrumento pequeño: np.unique sobre el arreglo, sin pasar por value_counts
+            values = column.to_numpy(copy=False)
+            present = values[~pd.isna(values)]
+            unique_counts = _unique_counts(present)
+            if unique_counts is not None:
+                _, first_index, _, counts = unique_counts
+                order = np.argsort(first_index, kind='stable')
+                missing_count = total_observations - len(present)
+                value_counts = pd.Series(counts[order], index=pd.Index(present[first_index[order]], dtype=object))
+        if value_counts is None:
+            all_counts = column.value_counts(dropna=False, sort=False)
+            is_missing = all_counts.index.isna()
+            missing_count = int(all_counts[is_missing].sum())
+            value_counts = all_counts[~is_missing]
     
     # Identificar únicos y repetidos
-    unique_values = (value_counts == 1).sum()  # Valores que aparecen solo 1 vez
-    duplicated_values = (value_counts > 1).sum()  # Valores que aparecen más de 1 vez
-    total_duplicated_items = (value_counts[value_counts > 1]).sum()  # Total de ítems repetidos
+    counts = value_counts.to_numpy()
+    duplicated_mask = counts > 1
+    unique_values = (counts == 1).sum()  # Valores que aparecen solo 1 vez
+    duplicated_values = duplicated_mask.sum()  # Valores que aparecen más de 1 vez
+    total_duplicated_items = counts[duplicated_mask].sum()  # Total de ítems repetidos
     
-    # Detalles de valores repetidos para el modal
+    # Detalles de valores repetidos para el modal (más repetidos primero, mismo orden que value_counts())
     repeated_details = []
-    for value, count in value_counts[value_counts > 1].items():
-        repeated_details.append({
-            'value': str(value),
-            'count': int(count),
-            'times_repeated': int(count - 1)  # Veces que se repite (sin contar la original)
-        })
+    if duplicated_values:
+        sorted_counts = value_counts.sort_values(ascending=False)
+        for value, count in sorted_counts[sorted_counts > 1].items():
+            repeated_details.append({
+                'value': str(value),
+                'count': int(count),
+                'times_repeated': int(count - 1)  # Veces que se repite (sin contar la original)
+            })
     
     return {
         'total_observations': total_observations,
@@ -49,11 +83,18 @@ def _analyze_id_variable_by_instrument(data: pd.DataFrame, variable: str) -> Dic
 
 def validate_duplicates(
     data: pd.DataFrame, 
-    categorization: VariableCategorization
+    categorization: VariableCategorization,
+    instrument_positions: Optional[List[Tuple[Dict[str, str], np.ndarray]]] = None
 ) -> DuplicateValidationResult:
     """
     Validación de identificadores de ítems con UX top-notch:
     Análisis por instrumento con únicos, repetidos y faltantes
+    
+    Args:
+        data: DataFrame a validar
+        categorization: Categorización de variables
+        instrument_positions: Agrupación ya calculada con get_instrument_positions sobre las
+            variables de instrumento presentes (ordenadas); si es None se calcula aquí
     """
     result = DuplicateValidationResult(is_valid=True)
     
@@ -72,8 +113,26 @@ def validate_duplicates(
             )
             return result
         
-        # Agrupar datos por instrumentos
-        instruments = _get_instruments(data, categorization)
+        # Solo las columnas que usa el check (instrumento + IDs): cada sub-DataFrame por instrumento
+        # copia esas columnas y no la base completa. IDs de texto como Categorical (una sola pasada
+        # de hash): el conteo por instrumento trabaja sobre códigos enteros
+        needed_columns = list(dict.fromkeys(
+            var for var in [*categorization.instrument_vars, *categorization.item_id_vars] if var in data.columns
+        ))
+        id_columns = {}
+        for var in needed_columns:
+            column = data[var]
+            if var in categorization.item_id_vars and column.dtype == object:
+                column = column.astype('category')
+            id_columns[var] = column
+        id_data = pd.DataFrame(id_columns, index=data.index)
+        
+        # Agrupar datos por instrumentos (con la combinación de valores de cada uno, sin re-parsear la clave)
+        instruments, instrument_combinations = _group_instruments(id_data, categorization, instrument_positions)
+        
+        # Variables de ID presentes/ausentes: se separan una vez, no en cada instrumento
+        present_id_vars = [var for var in categorization.item_id_vars if var in id_data.columns]
+        missing_id_vars = [var for var in categorization.item_id_vars if var not in id_data.columns]
         
         # Estructura nueva: análisis por instrumento
         instruments_analysis = {}
@@ -83,20 +142,20 @@ def validate_duplicates(
         for instrument_key, instrument_data in instruments.items():
             instrument_analysis = {
                 'total_observations': len(instrument_data),
+                'instrument_variables': instrument_combinations.get(instrument_key, {}),
                 'variables_analysis': {}
             }
             
-            for var in categorization.item_id_vars:
-                if var not in instrument_data.columns:
-                    result.add_error(
-                        f"Variable de ID '{var}' no encontrada en el instrumento {instrument_key}",
-                        "ID_VAR_NOT_FOUND",
-                        "error",
-                        variable=var,
-                        instrument=instrument_key
-                    )
-                    continue
-                
+            for var in missing_id_vars:
+                result.add_error(
+                    f"Variable de ID '{var}' no encontrada en el instrumento {instrument_key}",
+                    "ID_VAR_NOT_FOUND",
+                    "error",
+                    variable=var,
+                    instrument=instrument_key
+                )
+            
+            for var in present_id_vars:
                 var_analysis = _analyze_id_variable_by_instrument(instrument_data, var)
                 instrument_analysis['variables_analysis'][var] = var_analysis
                 
@@ -133,61 +192,42 @@ def validate_duplicates(
     return result
 
 
-def _get_instruments(data: pd.DataFrame, categorization: VariableCategorization) -> Dict[str, pd.DataFrame]:
+def _group_instruments(
+    data: pd.DataFrame, 
+    categorization: VariableCategorization,
+    instrument_positions: Optional[List[Tuple[Dict[str, str], np.ndarray]]] = None
+) -> Tuple[Dict[str, pd.DataFrame], Dict[str, Dict[str, str]]]:
     """
-    Get instruments grouped by instrument variables combination
+    Get instruments grouped by instrument variables combination, together with
+    the {variable: value} combination behind each instrument key
     """
     if not categorization.instrument_vars:
-        return {SINGLE_INSTRUMENT_KEY: data}
-    
-    instrument_groups = {}
+        return {SINGLE_INSTRUMENT_KEY: data}, {SINGLE_INSTRUMENT_KEY: {}}
     
-    for _, row in data.iterrows():
-        instrument_values = {}
-        for var in categorization.instrument_vars:
-            if var in data.columns:
-                instrument_values[var] = str(row[var])
-        
-        instrument_key = '|'.join([f"{k}:{v}" for k, v in sorted(instrument_values.items())])
-        
-        if instrument_key not in instrument_groups:
-            instrument_groups[instrument_key] = []
-        
-        instrument_groups[instrument_key].append(row.to_dict())
+    # Variables presentes: orden original para la combinación, orden alfabético para la clave
+    present_vars = list(dict.fromkeys(var for var in categorization.instrument_vars if var in data.columns))
+    sorted_vars = get_present_instrument_vars(data, categorization)
     
+    # Sub-DataFrames por posición (sin to_dict/reconstrucción), en orden de primera aparición
     instruments = {}
-    for key, rows in instrument_groups.items():
-        instruments[key] = pd.DataFrame(rows)
+    instrument_combinations = {}
+    if instrument_positions is None:
+        instrument_positions = get_instrument_positions(data, sorted_vars)
     
-    return instruments
-
-def _find_duplicates_in_instrument(
-    instrument_data: pd.DataFrame, 
-    instrument_combination: Dict[str, str],
-    categorization: VariableCategorization
-) -> List[DuplicateItem]:
-    """Find duplicate items within a single instrument"""
-    duplicates = []
-    
-    for item_var in categorization.item_id_vars:
-        if item_var not in instrument_data.columns:
-            continue
-        
-        # Find duplicated values (excluding NaN)
-        non_null_data = instrument_data[item_var].dropna()
-        value_counts = non_null_data.value_counts()
-        duplicated_values = value_counts[value_counts > 1]
-        
-        for item_id, count in duplicated_values.items():
-            # Get row indices where this item appears
-            mask = instrument_data[item_var] == item_id
-            row_indices = instrument_data[mask].index.tolist()
-            
-            duplicate_item = DuplicateItem(
-                item_id=str(item_id),
-                instrument_combination=instrument_combination,
-                row_indices=row_indices
-            )
-            duplicates.append(duplicate_item)
+    for values_by_var, positions in instrument_positions:
+        instrument_key = format_instrument_key(values_by_var, sorted_vars)
+        instruments[instrument_key] = data.iloc[positions]
+        instrument_combinations[instrument_key] = {var: values_by_var[var] for var in present_vars}
     
-    return duplicates
\ No newline at end of file
+    return instruments, instrument_combinations
+
+def _unique_counts(values: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    np.unique with first index, inverse and counts for values without missing entries
+    (values[first_index] keeps the first-seen value when equal values differ in type);
+    None if the values cannot be sorted (e.g. mixed text and numbers in an object column)
+    """
+    try:
+        return np.unique(values, return_index=True, return_inverse=True, return_counts=True)
+    except TypeError:
+        return None
@@ -14,25 +14,22 @@ def check_missing_values_in_columns(
     Check for missing values in specified columns
     """
     missing_details = []
-    has_missing_values = False
+    total_count = len(data)
     
-    for column in columns_to_check:
-        if column in data.columns:
-            missing_count = data[column].isna().sum()
-            total_count = len(data)
-            
-            if missing_count > 0:
-                has_missing_values = True
-                percentage = round((missing_count / total_count) * 100, 2)
-                missing_details.append({
-                    'column': column,
-                    'missing_count': int(missing_count),
-                    'total_count': int(total_count),
-                    'percentage': percentage
-                })
+    # Un solo isna().sum() sobre todas las columnas presentes, en vez de una pasada por columna
+    present_columns = [column for column in columns_to_check if column in data.columns]
+    if present_columns:
+        missing_counts = data[present_columns].isna().sum(axis=0)
+        for column, missing_count in missing_counts[missing_counts > 0].items():
+            missing_details.append({
+                'column': column,
+                'missing_count': int(missing_count),
+                'total_count': int(total_count),
+                'percentage': round((missing_count / total_count) * 100, 2)
+            })
     
     return {
-        'has_missing_values': has_missing_values,
+        'has_missing_values': bool(missing_details),
         'details': missing_details,
         'total_columns_checked': len(columns_to_check)
-    }
\ No newline at end of file
+    }
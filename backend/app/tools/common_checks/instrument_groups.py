@@ -0,0 +1,202 @@
+"""
+Agrupación reutilizable de filas por instrumento
+Puede ser usada por cualquier herramienta (ensamblaje, respuestas, etc.)
+
+Un instrumento es una combinación de valores de las variables de instrumento presentes.
+Su clave técnica es "var:valor|var:valor" con las variables en orden alfabético y el
+texto str() de cada valor; todos los checks y exportadores usan estas mismas claves.
+"""
+import pandas as pd
+import numpy as np
+from pandas.api.types import infer_dtype
+from typing import Dict, List, Optional, Tuple
+from ...core.models import VariableCategorization
+
+# Clave del instrumento único (sin variables de instrumento definidas)
+SINGLE_INSTRUMENT_KEY = "default_instrument"
+
+
+def get_present_instrument_vars(data: pd.DataFrame, categorization: VariableCategorization) -> List[str]:
+    """
+    Variables de instrumento presentes en data, en el orden de la clave (alfabético, sin repetidas)
+    """
+    return sorted({var for var in categorization.instrument_vars if var in data.columns})
+
+
+def format_instrument_key(values_by_var: Dict[str, str], instrument_vars: List[str]) -> str:
+    """
+    Clave técnica del instrumento: "var:valor|var:valor" en el orden de instrument_vars
+    """
+    return '|'.join([f"{var}:{values_by_var[var]}" for var in instrument_vars])
+
+
+def get_instrument_positions(
+    data: pd.DataFrame,
+    instrument_vars: List[str]
+) -> List[Tuple[Dict[str, str], np.ndarray]]:
+    """
+    Group rows by the str() value of each instrument variable without iterating rows
+    
+    Each column is reduced to one integer code per distinct str() text (see _text_codes), so
+    values with the same text (e.g. 1 and '1') share a code and values with different text
+    (None, NaN and NaT; 1 and 1.0) do not. The per-column codes are combined into a single
+    integer code per row, re-factorized after each column so it stays below len(data) and
+    follows the order of first appearance.
+    
+    Args:
+        data: DataFrame with the instrument variables
+        instrument_vars: Instrument variables present in data
+    
+    Returns:
+        List of ({variable: str value}, row positions) per instrument, in order of first appearance
+    """
+    composite = np.zeros(len(data), dtype=np.int64)
+    var_codes = []
+    var_labels = []
+    
+    for var in instrument_vars:
+        codes, unique_labels = _text_codes(data[var])
+        
+        composite, _ = pd.factorize(composite * len(unique_labels) + codes)
+        var_codes.append(codes)
+        var_labels.append(unique_labels)
+    
+    if len(composite) == 0:
+        return []
+    
+    # Posiciones de cada instrumento: orden estable por código (las filas quedan en orden original)
+    rows_by_code = np.argsort(composite, kind='stable')
+    group_sizes = np.bincount(composite)
+    group_starts = np.concatenate(([0], np.cumsum(group_sizes)[:-1]))
+    
+    groups = []
+    for start, size in zip(group_starts, group_sizes):
+        positions = rows_by_code[start:start + size]
+        first_row = positions[0]
+        values_by_var = {
+            var: labels[codes[first_row]]
+            for var, codes, labels in zip(instrument_vars, var_codes, var_labels)
+        }
+        groups.append((values_by_var, positions))
+    
+    return groups
+
+
+def instrument_indices(
+    data: pd.DataFrame,
+    categorization: VariableCategorization,
+    instrument_positions: Optional[List[Tuple[Dict[str, str], np.ndarray]]] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Posiciones de fila (iloc) de cada instrumento por clave, sin construir sub-DataFrames
+    
+    Args:
+        data: DataFrame a agrupar
+        categorization: Categorización de variables
+        instrument_positions: Agrupación ya calculada con get_instrument_positions sobre
+            get_present_instrument_vars(data, categorization); si es None se calcula aquí
+    """
+    if not categorization.instrument_vars:
+        return {SINGLE_INSTRUMENT_KEY: np.arange(len(data))}
+    
+    instrument_vars = get_present_instrument_vars(data, categorization)
+    if instrument_positions is None:
+        instrument_positions = get_instrument_positions(data, instrument_vars)
+    
+    return {
+        format_instrument_key(values_by_var, instrument_vars): positions
+        for values_by_var, positions in instrument_positions
+    }
+
+
+
+def instrument_mask(
+    data: pd.DataFrame,
+    categorization: VariableCategorization,
+    instrument_key: str
+) -> np.ndarray:
+    """
+    Máscara booleana de las filas de un solo instrumento, sin agrupar toda la base
+    
+    La clave se compara con el texto de los valores de cada variable (mismo str() que
+    instrument_indices), así que valores con ':' o '|' también coinciden. Una clave que no
+    corresponde a ningún instrumento no selecciona filas.
+    """
+    if not categorization.instrument_vars:
+        return np.full(len(data), instrument_key == SINGLE_INSTRUMENT_KEY)
+    
+    instrument_vars = get_present_instrument_vars(data, categorization)
+    column_codes = [_text_codes(data[var]) for var in instrument_vars]
+    lookups = [{label: code for code, label in enumerate(labels)} for _, labels in column_codes]
+    
+    matched_codes = _match_instrument_key(instrument_key, instrument_vars, lookups, 0, 0)
+    if matched_codes is None:
+        return np.zeros(len(data), dtype=bool)
+    
+    mask = np.ones(len(data), dtype=bool)
+    for (codes, _), code in zip(column_codes, matched_codes):
+        mask &= codes == code
+    
+    return mask
+
+
+def _match_instrument_key(
+    instrument_key: str,
+    instrument_vars: List[str],
+    lookups: List[Dict[str, int]],
+    start: int,
+    var_index: int
+) -> Optional[List[int]]:
+    """
+    Códigos de cada variable que forman instrument_key desde start, o None si no la forman
+    
+    Un valor puede contener el separador de la variable siguiente, así que se prueba cada
+    corte posible y solo se acepta el que deja valores existentes en todas las variables.
+    """
+    if not instrument_vars:
+        return [] if instrument_key == '' else None
+    
+    var = instrument_vars[var_index]
+    prefix = f"{var}:" if var_index == 0 else f"|{var}:"
+    if not instrument_key.startswith(prefix, start):
+        return None
+    
+    value_start = start + len(prefix)
+    if var_index == len(instrument_vars) - 1:
+        code = lookups[var_index].get(instrument_key[value_start:])
+        return None if code is None else [code]
+    
+    next_prefix = f"|{instrument_vars[var_index + 1]}:"
+    value_end = instrument_key.find(next_prefix, value_start)
+    while value_end != -1:
+        code = lookups[var_index].get(instrument_key[value_start:value_end])
+        if code is not None:
+            rest = _match_instrument_key(instrument_key, instrument_vars, lookups, value_end, var_index + 1)
+            if rest is not None:
+                return [code] + rest
+        value_end = instrument_key.find(next_prefix, value_end + 1)
+    
+    return None
+
+def _text_codes(column: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Integer code per row for the str() text of each value, and the text of each code
+    
+    str() runs once per distinct value. factorize treats equal values of different type
+    (1, 1.0, True) and every missing marker (None, NaN, NaT) as one value, so object columns
+    holding non-text values are converted row by row, and missing rows are labelled by the
+    str() of their own value.
+    """
+    codes, uniques = pd.factorize(column)
+    
+    if column.dtype == object and infer_dtype(uniques, skipna=True) not in ('string', 'empty'):
+        return pd.factorize(column.astype(str).to_numpy(dtype=object))
+    
+    labels = [str(value) for value in uniques]
+    na_rows = np.flatnonzero(codes < 0)
+    if len(na_rows):
+        codes[na_rows] = len(labels) + np.arange(len(na_rows))
+        labels.extend(str(value) for value in column.iloc[na_rows].to_numpy(dtype=object))
+    
+    label_codes, unique_labels = pd.factorize(np.array(labels, dtype=object))
+    return label_codes[codes], unique_labels
@@ -2,9 +2,11 @@
 EnsamblajeToolKit - Herramienta para validación de bases de datos de ensamblajes
 """
 import pandas as pd
+import numpy as np
 from typing import Dict, Any
 from ...core.models import VariableCategorization, ValidationReport
 from .validator import EnsamblajeValidator
+from ..common_checks.instrument_groups import instrument_mask
 from .exporter import EnsamblajeExporter
 from .constants import get_instrument_display_name
 
@@ -61,18 +63,10 @@ class EnsamblajeToolKit:
         # Filter data by instrument if specified
         filtered_data = self.data
         if instrument and instrument != 'all' and self.categorization.instrument_vars:
-            # Parse instrument combination from key
-            instrument_filters = {}
-            if '|' in instrument:
-                for pair in instrument.split('|'):
-                    if ':' in pair:
-                        key, value = pair.split(':', 1)
-                        instrument_filters[key] = value
-            
-            # Apply filters
-            for var, value in instrument_filters.items():
-                if var in filtered_data.columns:
-                    filtered_data = filtered_data[filtered_data[var].astype(str) == value]
+            # Solo las filas del instrumento pedido: la clave se compara con el texto de los valores
+            # de cada variable (mismo formato que los checks), sin agrupar toda la base. Valores con
+            # ':' o '|' también coinciden; una clave que no corresponde a ningún instrumento no tiene filas
+            filtered_data = self.data[instrument_mask(self.data, self.categorization, instrument)]
         
         if variable not in filtered_data.columns:
             return {
@@ -81,32 +75,37 @@ class EnsamblajeToolKit:
                 'total_count': 0
             }
         
-        # Get variable values with counts
-        value_counts = filtered_data[variable].value_counts(dropna=False)
+        # Posiciones de las filas de cada valor en una sola pasada (faltantes incluidos como un valor):
+        # códigos por valor y filas agrupadas por código con un argsort estable
+        column = filtered_data[variable]
+        codes, uniques = pd.factorize(column, use_na_sentinel=False)
+        rows_by_code = np.argsort(codes, kind='stable')
+        value_counts = np.bincount(codes, minlength=len(uniques))
+        value_starts = np.concatenate(([0], np.cumsum(value_counts)[:-1]))
         values_data = []
         
         # Calculate completeness statistics
         total_rows = len(filtered_data)
-        empty_count = filtered_data[variable].isna().sum()
+        empty_count = column.isna().sum()
         non_empty_count = total_rows - empty_count
         completeness = round((non_empty_count / total_rows) * 100, 2) if total_rows > 0 else 0
         
-        for value, count in value_counts.items():
-            # Get row indices for this value
-            if pd.isna(value):
-                mask = filtered_data[variable].isna()
-                display_value = '(vacío/NaN)'
-            else:
-                mask = filtered_data[variable] == value
-                display_value = str(value)
-            
-            row_indices = filtered_data[mask].index.tolist()
+        # Porcentajes de todos los valores en una sola operación
+        percentages = np.round(value_counts / total_rows * 100, 2) if total_rows > 0 else value_counts
+        
+        # Más frecuentes primero; empates en orden de primera aparición
+        for code in np.argsort(-value_counts, kind='stable'):
+            value = uniques[code]
+            count = int(value_counts[code])
+            display_value = '(vacío/NaN)' if pd.isna(value) else str(value)
+            # Limit to first 10 indices for performance: se recortan las posiciones antes de convertir
+            first_positions = rows_by_code[value_starts[code]:value_starts[code] + min(count, 10)]
             
             values_data.append({
                 'value': display_value,
-                'count': int(count),
-                'percentage': round((count / len(filtered_data)) * 100, 2),
-                'row_indices': row_indices[:10]  # Limit to first 10 indices for performance
+                'count': count,
+                'percentage': float(percentages[code]),
+                'row_indices': filtered_data.index.take(first_positions).tolist()
             })
         
         return {
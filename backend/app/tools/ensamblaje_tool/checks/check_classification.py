@@ -2,21 +2,30 @@
 Check específico de variables de clasificación para instrumentos de ensamblaje
 """
 import pandas as pd
-from typing import Dict
+import numpy as np
+from typing import Dict, List, Optional, Tuple
 from ....core.models import VariableCategorization, ClassificationValidationResult
-from ..constants import SINGLE_INSTRUMENT_KEY, SINGLE_INSTRUMENT_DISPLAY
+from ...common_checks.instrument_groups import instrument_indices
+from ..constants import SINGLE_INSTRUMENT_KEY, SINGLE_INSTRUMENT_DISPLAY, MAX_REPORTED_EMPTY_CELLS
 
 def analyze_classification_variables(
     data: pd.DataFrame, 
-    categorization: VariableCategorization
+    categorization: VariableCategorization,
+    instrument_positions: Optional[List[Tuple[Dict[str, str], np.ndarray]]] = None
 ) -> ClassificationValidationResult:
     """
     Análisis de variables de clasificación específico para instrumentos de ensamblaje
+    
+    Args:
+        data: DataFrame a analizar
+        categorization: Categorización de variables
+        instrument_positions: Agrupación ya calculada con get_instrument_positions sobre las
+            variables de instrumento presentes (ordenadas); si es None se calcula aquí
     """
     result = ClassificationValidationResult(is_valid=True)
     
-    # Get instruments for analysis
-    instruments = _get_instruments(data, categorization)
+    # Get instruments for analysis (posiciones de fila por instrumento, sin sub-DataFrames)
+    instruments = instrument_indices(data, categorization, instrument_positions)
     
     # Add validation parameters info
     result.validation_parameters = {
@@ -36,39 +45,43 @@ def analyze_classification_variables(
             return result
         
         empty_cells = {}
+        empty_counts = {}
         completeness_stats = {}
-        unique_counts_per_instrument = {}
         
-        for var in categorization.classification_vars:
-            if var not in data.columns:
-                result.add_warning(
-                    f"Variable de clasificación '{var}' no encontrada en los datos",
-                    "CLASSIFICATION_VAR_NOT_FOUND",
-                    variable=var
-                )
-                continue
-            
-            # Check for empty cells in overall data
-            null_mask = data[var].isnull()
-            empty_indices = data[null_mask].index.tolist()
+        # Separar variables presentes y ausentes una sola vez
+        columns = set(data.columns)
+        present_vars = list(dict.fromkeys(var for var in categorization.classification_vars if var in columns))
+        missing_vars = [var for var in categorization.classification_vars if var not in columns]
+        
+        for var in missing_vars:
+            result.add_warning(
+                f"Variable de clasificación '{var}' no encontrada en los datos",
+                "CLASSIFICATION_VAR_NOT_FOUND",
+                variable=var
+            )
+        
+        # Conteo de no vacíos y de valores únicos por instrumento en una sola pasada
+        total_rows = len(data)
+        non_null_counts, unique_counts = _count_and_nunique_by_instrument(data, categorization, present_vars, instruments)
+        null_counts = total_rows - non_null_counts.sum()
+        
+        for var in present_vars:
+            # Check for empty cells in overall data (only the first row indices are kept)
+            empty_count = int(null_counts[var])
             
-            if empty_indices:
-                empty_cells[var] = empty_indices
+            if empty_count:
+                empty_positions = np.flatnonzero(data[var].isna().to_numpy())[:MAX_REPORTED_EMPTY_CELLS]
+                empty_cells[var] = data.index.take(empty_positions).tolist()
+                empty_counts[var] = empty_count
             
             # Calculate completeness percentage
-            total_rows = len(data)
-            complete_rows = total_rows - len(empty_indices)
+            complete_rows = total_rows - empty_count
             completeness_percentage = (complete_rows / total_rows) * 100 if total_rows > 0 else 0
             completeness_stats[var] = completeness_percentage
-            
-            # Count unique values per instrument
-            for instrument_key, instrument_data in instruments.items():
-                if instrument_key not in unique_counts_per_instrument:
-                    unique_counts_per_instrument[instrument_key] = {}
-                
-                if var in instrument_data.columns:
-                    unique_count = instrument_data[var].dropna().nunique()
-                    unique_counts_per_instrument[instrument_key][var] = unique_count
+        
+        # Matriz instrumento x variable ya agregada: se convierte de una vez, sin recorrer por celda
+        unique_counts = unique_counts.astype(np.int64)
+        unique_counts_per_instrument = unique_counts.to_dict(orient='index')
         
         result.empty_cells = empty_cells
         result.completeness_stats = completeness_stats
@@ -76,7 +89,7 @@ def analyze_classification_variables(
         
         # Statistics
         if empty_cells:
-            total_empty = sum(len(indices) for indices in empty_cells.values())
+            total_empty = sum(empty_counts.values())
             result.statistics['total_empty_cells'] = total_empty
             result.statistics['variables_with_empty_cells'] = len(empty_cells)
         
@@ -88,13 +101,8 @@ def analyze_classification_variables(
         if unique_counts_per_instrument:
             result.statistics['instruments_analyzed'] = len(unique_counts_per_instrument)
             
-            # Calculate average unique values per variable across instruments
-            var_averages = {}
-            for var in categorization.classification_vars:
-                if var in data.columns:
-                    counts = [inst_data.get(var, 0) for inst_data in unique_counts_per_instrument.values()]
-                    if counts:
-                        var_averages[var] = round(sum(counts) / len(counts), 2)
+            # Calculate average unique values per variable across instruments (column means of the matrix)
+            var_averages = {var: round(mean, 2) for var, mean in unique_counts.mean(axis=0).items()}
             
             result.statistics['average_unique_values_per_variable'] = var_averages
         
@@ -107,30 +115,45 @@ def analyze_classification_variables(
     
     return result
 
-def _get_instruments(data: pd.DataFrame, categorization: VariableCategorization) -> Dict[str, pd.DataFrame]:
+def _count_and_nunique_by_instrument(
+    data: pd.DataFrame,
+    categorization: VariableCategorization,
+    present_vars: list,
+    instrument_indices: Dict[str, np.ndarray]
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
-    Get instruments grouped by instrument variables combination
+    Count non-empty and unique values of every variable per instrument with a single aggregation
+    
+    Returns:
+        (non_null_counts, unique_counts): DataFrames indexed by instrument key with one column per variable
     """
-    if not categorization.instrument_vars:
-        return {SINGLE_INSTRUMENT_KEY: data}
+    if not present_vars:
+        empty = pd.DataFrame(index=pd.Index([], dtype=object))
+        return empty, empty
     
-    instrument_groups = {}
+    # Variables de texto como Categorical (un solo hash por columna): count/nunique trabajan sobre códigos
+    class_data = data[present_vars]
+    text_vars = [var for var in present_vars if class_data[var].dtype == object]
+    if text_vars:
+        class_data = class_data.assign(**{var: class_data[var].astype('category') for var in text_vars})
     
-    for _, row in data.iterrows():
-        instrument_values = {}
-        for var in categorization.instrument_vars:
-            if var in data.columns:
-                instrument_values[var] = str(row[var])
-        
-        instrument_key = '|'.join([f"{k}:{v}" for k, v in sorted(instrument_values.items())])
-        
-        if instrument_key not in instrument_groups:
-            instrument_groups[instrument_key] = []
-        
-        instrument_groups[instrument_key].append(row.to_dict())
+    if categorization.instrument_vars:
+        instrument_labels = _get_instrument_labels(len(data), instrument_indices)
+        stats = class_data.groupby(instrument_labels, sort=False, observed=True).agg(['count', 'nunique'])
+        return stats.xs('count', axis=1, level=1), stats.xs('nunique', axis=1, level=1)
     
-    instruments = {}
-    for key, rows in instrument_groups.items():
-        instruments[key] = pd.DataFrame(rows)
+    stats = class_data.agg(['count', 'nunique'])
+    return (
+        stats.loc[['count']].set_axis([SINGLE_INSTRUMENT_KEY]),
+        stats.loc[['nunique']].set_axis([SINGLE_INSTRUMENT_KEY])
+    )
+
+def _get_instrument_labels(n_rows: int, instrument_indices: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Get the instrument key of every row from the row positions of each instrument
+    """
+    labels = np.empty(n_rows, dtype=object)
+    for instrument_key, positions in instrument_indices.items():
+        labels[positions] = instrument_key
     
-    return instruments
\ No newline at end of file
+    return labels
@@ -3,8 +3,15 @@ Validación de Identificadores de Instrumentos
 Información sobre instrumentos, observaciones por instrumento, y nombres de instrumentos
 """
 import pandas as pd
-from typing import Dict, Any, List
+import numpy as np
+from typing import Dict, Any, FrozenSet, List, Optional, Tuple
 from ....core.models import InstrumentValidationResult
+from ...common_checks.instrument_groups import (
+    get_present_instrument_vars, format_instrument_key, get_instrument_positions
+)
+
+# Palabras clave de variables temporales (años, fechas, etc.): van al final del nombre entre paréntesis
+TEMPORAL_KEYWORDS = ('año', 'year', 'fecha', 'date', 'periodo', 'tanda')
 
 
 def _calculate_variable_hierarchy(data: pd.DataFrame, instrument_vars: List[str]) -> List[str]:
@@ -14,23 +21,34 @@ def _calculate_variable_hierarchy(data: pd.DataFrame, instrument_vars: List[str]
     if len(instrument_vars) <= 1:
         return instrument_vars
     
-    # Calcular cardinalidad (número de valores únicos) para cada variable
-    cardinalities = []
-    for var in instrument_vars:
-        if var in data.columns:
-            cardinality = data[var].nunique()
-            cardinalities.append((var, cardinality))
-    
-    # Ordenar por cardinalidad (menor = más general)
-    cardinalities.sort(key=lambda x: x[1])
+    # Calcular cardinalidad (número de valores únicos) de todas las variables en una sola llamada
+    cardinalities = data[[var for var in instrument_vars if var in data.columns]].nunique()
     
-    return [var for var, _ in cardinalities]
+    # Ordenar por cardinalidad (menor = más general); orden estable para los empates
+    return cardinalities.sort_values(kind='stable').index.tolist()
 
 
-def _create_instrument_display_name(instrument_values: Dict[str, str], hierarchy: List[str] = None) -> str:
+def _get_temporal_vars(instrument_vars: List[str]) -> FrozenSet[str]:
+    """
+    Variables temporales (nombre con alguna de TEMPORAL_KEYWORDS), detectadas una vez por validación
+    """
+    return frozenset(
+        var for var in instrument_vars
+        if any(keyword in var.lower() for keyword in TEMPORAL_KEYWORDS)
+    )
+
+
+def _create_instrument_display_name(
+    instrument_values: Dict[str, str], 
+    hierarchy: List[str] = None, 
+    temporal_vars: FrozenSet[str] = None
+) -> str:
     """
     Crea un nombre atractivo y legible para el instrumento
     Usa jerarquía de general a específico basada en cardinalidad
+    
+    Args:
+        temporal_vars: Resultado de _get_temporal_vars; si es None se detectan aquí
     """
     if not instrument_values:
         return "Instrumento sin identificar"
@@ -42,6 +60,8 @@ def _create_instrument_display_name(instrument_values: Dict[str, str], hierarchy
     
     # Usar jerarquía proporcionada o orden original
     ordered_vars = hierarchy if hierarchy else list(instrument_values.keys())
+    if temporal_vars is None:
+        temporal_vars = _get_temporal_vars(ordered_vars)
     
     # Crear partes del nombre siguiendo jerarquía
     parts = []
@@ -54,7 +74,7 @@ def _create_instrument_display_name(instrument_values: Dict[str, str], hierarchy
         value = str(instrument_values[var_name])
 
         # Detectar variables temporales (van al final entre paréntesis)
-        if any(keyword in var_name.lower() for keyword in ['año', 'year', 'fecha', 'date', 'periodo', 'tanda']):
+        if var_name in temporal_vars:
             temporal_parts.append(value)
         else:
             parts.append(value)
@@ -69,7 +89,11 @@ def _create_instrument_display_name(instrument_values: Dict[str, str], hierarchy
     return display_name
 
 
-def validate_instruments_identification(data: pd.DataFrame, categorization) -> InstrumentValidationResult:
+def validate_instruments_identification(
+    data: pd.DataFrame, 
+    categorization, 
+    instrument_positions: Optional[List[Tuple[Dict[str, str], np.ndarray]]] = None
+) -> InstrumentValidationResult:
     """
     Validación - Identificador de instrumentos (INFORMATIVA)
     
@@ -81,6 +105,8 @@ def validate_instruments_identification(data: pd.DataFrame, categorization) -> I
     Args:
         data: DataFrame con los datos
         categorization: VariableCategorization con las variables categorizadas
+        instrument_positions: Agrupación ya calculada con get_instrument_positions sobre las
+            variables de instrumento presentes (ordenadas); si es None se calcula aquí
     
     Returns:
         InstrumentValidationResult con información de instrumentos
@@ -112,31 +138,32 @@ def validate_instruments_identification(data: pd.DataFrame, categorization) -> I
         else:
             # Calcular jerarquía de variables por cardinalidad
             variable_hierarchy = _calculate_variable_hierarchy(data, instrument_vars)
+            temporal_vars = _get_temporal_vars(instrument_vars)
             
-            # Agrupar por variables de instrumento
-            instruments_data = {}
+            # Variables presentes y orden de la clave: se calculan una vez
+            present_vars = [var for var in instrument_vars if var in data.columns]
+            sorted_vars = get_present_instrument_vars(data, categorization)
             
-            for index, row in data.iterrows():
-                # Obtener valores de variables de instrumento
-                instrument_values = {}
-                for var in instrument_vars:
-                    if var in data.columns:
-                        instrument_values[var] = str(row[var])
+            # Posiciones de fila por instrumento (códigos por columna, sin iterrows), o la agrupación
+            # compartida del validador; el nombre se crea una vez por instrumento y no por fila
+            if instrument_positions is None:
+                instrument_positions = get_instrument_positions(data, sorted_vars)
+            
+            instruments_data = {}
+            for values_by_var, positions in instrument_positions:
+                instrument_values = {var: values_by_var[var] for var in present_vars}
                 
                 # Crear clave única para agrupar (técnica)
-                instrument_key = "|".join([f"{k}:{v}" for k, v in sorted(instrument_values.items())])
+                instrument_key = format_instrument_key(values_by_var, sorted_vars)
                 
-                # Crear nombre atractivo para mostrar usando jerarquía
-                display_name = _create_instrument_display_name(instrument_values, variable_hierarchy)
-                
-                if instrument_key not in instruments_data:
-                    instruments_data[instrument_key] = {
-                        'display_name': display_name,
-                        'instrument_values': instrument_values,
-                        'observations': []
-                    }
-                
-                instruments_data[instrument_key]['observations'].append(index)
+                instruments_data[instrument_key] = {
+                    # Crear nombre atractivo para mostrar usando jerarquía
+                    'display_name': _create_instrument_display_name(
+                        instrument_values, variable_hierarchy, temporal_vars
+                    ),
+                    'instrument_values': instrument_values,
+                    'observations_count': len(positions)
+                }
             
             # Crear resumen
             result.instrument_summary = {
@@ -149,7 +176,7 @@ def validate_instruments_identification(data: pd.DataFrame, categorization) -> I
             for key, data_info in instruments_data.items():
                 instruments_detail[key] = {
                     'display_name': data_info['display_name'],
-                    'observations_count': len(data_info['observations']),
+                    'observations_count': data_info['observations_count'],
                     'instrument_variables': data_info['instrument_values']
                 }
             
@@ -2,8 +2,10 @@
 Check específico de metadata para instrumentos de ensamblaje
 """
 import pandas as pd
-from typing import Dict, Set, List
+import numpy as np
+from typing import Dict, Set, List, Optional, Tuple
 from ....core.models import VariableCategorization, MetadataValidationResult
+from ...common_checks.instrument_groups import instrument_indices
 
 def smart_sort_values(values_list: List[str]) -> List[str]:
     """
@@ -14,83 +16,73 @@ def smart_sort_values(values_list: List[str]) -> List[str]:
     if not values_list:
         return values_list
     
-    # Separar valores numéricos y no-numéricos
-    numeric_values = []
-    string_values = []
+    # Separar valores numéricos y no-numéricos con un solo parseo vectorizado
+    # (to_numeric en C en lugar de float() con try/except por valor)
+    values = np.asarray(values_list, dtype=object)
+    numbers = pd.to_numeric(values, errors='coerce').astype(np.float64)
+    numeric_mask = ~np.isnan(numbers)
     
-    for value in values_list:
-        try:
-            # Intentar convertir a número
-            float_val = float(value)
-            numeric_values.append((float_val, value))  # Guardar tanto el número como el string original
-        except (ValueError, TypeError):
-            string_values.append(value)
-    
-    # Ordenar cada grupo
-    numeric_values.sort(key=lambda x: x[0])  # Ordenar por valor numérico
-    string_values.sort()  # Ordenar alfabéticamente
+    # Ordenar cada grupo: números por valor (estable ante empates), strings alfabéticamente
+    numeric_order = np.argsort(numbers[numeric_mask], kind='stable')
+    numeric_values = values[numeric_mask][numeric_order].tolist()
+    string_values = sorted(values[~numeric_mask].tolist())
     
     # Combinar: números primero, luego strings
-    result = [original_str for _, original_str in numeric_values] + string_values
+    result = numeric_values + string_values
     return result
 
-def _get_instruments_from_data(data: pd.DataFrame, categorization: VariableCategorization) -> Dict[str, pd.DataFrame]:
+def _factorize_labels(column: pd.Series) -> Tuple[np.ndarray, List[str]]:
     """
-    Agrupa los datos por instrumentos usando las variables de identificación de instrumentos
+    Códigos enteros por fila según el texto de cada valor (-1 para faltantes) y el texto de cada código
+    
+    Los códigos siguen el orden de smart_sort_values, que se calcula una sola vez por variable:
+    la distribución de cada instrumento queda ordenada con solo recorrer sus códigos en orden.
     """
-    if not categorization.instrument_vars:
-        return {'default_instrument': data}
+    codes, uniques = pd.factorize(column)
     
-    instruments = {}
+    # str() una vez por valor distinto; valores con el mismo texto comparten código
+    label_codes, labels = pd.factorize(np.array([str(value) for value in uniques], dtype=object))
     
-    for index, row in data.iterrows():
-        # Crear clave del instrumento
-        instrument_values = {}
-        for var in categorization.instrument_vars:
-            if var in data.columns:
-                instrument_values[var] = str(row[var])
-        
-        instrument_key = "|".join([f"{k}:{v}" for k, v in sorted(instrument_values.items())])
-        
-        if instrument_key not in instruments:
-            instruments[instrument_key] = []
-        
-        instruments[instrument_key].append(row.to_dict())
+    # Renumerar los códigos según el orden de presentación (mismo orden que ordenar cada instrumento)
+    sorted_labels = smart_sort_values(labels.tolist())
+    rank = np.empty(len(labels), dtype=np.intp)
+    rank[pd.Index(labels).get_indexer(sorted_labels)] = np.arange(len(labels))
     
-    # Convertir listas a DataFrames
-    for key, rows in instruments.items():
-        instruments[key] = pd.DataFrame(rows)
+    if len(uniques) > 0:
+        codes = np.where(codes >= 0, rank[label_codes][codes], -1)
     
-    return instruments
+    return codes, sorted_labels
 
 
-def _analyze_variable_by_instrument(data: pd.DataFrame, variable: str) -> Dict[str, any]:
+def _analyze_variable_by_instrument(codes: np.ndarray, labels: List[str]) -> Dict[str, any]:
     """
     Analiza una variable crítica mostrando distribución de valores y faltantes
+    
+    Args:
+        codes: Códigos de _factorize_labels en las filas del instrumento
+        labels: Texto de cada código, en orden de presentación
     """
-    # Contar valores no nulos
-    non_null_data = data[variable].dropna()
-    value_counts = non_null_data.value_counts().to_dict()
+    # Contar valores no nulos solo entre los códigos del instrumento (los faltantes tienen código -1):
+    # el costo depende de las filas del instrumento y no del número de valores distintos de la variable
+    present_codes = codes[codes >= 0]
+    observed_codes, counts = np.unique(present_codes, return_counts=True)
 
-    # Contar valores faltantes
-    missing_count = data[variable].isnull().sum()
-    total_observations = len(data)
+    total_observations = len(codes)
+    missing_count = total_observations - len(present_codes)
 
-    # Convertir value_counts a strings para mantener consistencia de tipos
-    value_counts_str = {str(k): v for k, v in value_counts.items()}
+    # Distribución ordenada: np.unique devuelve los códigos en orden y estos ya siguen smart_sort_values
+    unique_values = [labels[code] for code in observed_codes]
 
-    # Preparar distribución ordenada
-    unique_values = smart_sort_values([str(val) for val in value_counts.keys()])
+    # Porcentajes en una sola operación vectorizada sobre los conteos ya ordenados
+    if total_observations > 0:
+        percentages = np.round(counts / total_observations * 100, 1).tolist()
+    else:
+        percentages = [0] * len(counts)
 
-    distribution = []
-    for value in unique_values:
-        count = value_counts_str.get(value, 0)
-        percentage = (count / total_observations) * 100 if total_observations > 0 else 0
-        distribution.append({
-            'value': str(value),
-            'count': int(count),
-            'percentage': round(percentage, 1)
-        })
+    distribution = [
+        {'value': value, 'count': count, 'percentage': percentage}
+        for value, count, percentage in zip(unique_values, counts.tolist(), percentages)
+    ]
 
     return {
         'total_observations': total_observations,
@@ -103,10 +95,17 @@ def _analyze_variable_by_instrument(data: pd.DataFrame, variable: str) -> Dict[s
 
 def validate_metadata_completeness(
     data: pd.DataFrame, 
-    categorization: VariableCategorization
+    categorization: VariableCategorization,
+    instrument_positions: Optional[List[Tuple[Dict[str, str], np.ndarray]]] = None
 ) -> MetadataValidationResult:
     """
     Validación de variables críticas por instrumento con enfoque en valores faltantes y distribución
+    
+    Args:
+        data: DataFrame a analizar
+        categorization: Categorización de variables
+        instrument_positions: Agrupación ya calculada con get_instrument_positions sobre las
+            variables de instrumento presentes (ordenadas); si es None se calcula aquí
     """
     result = MetadataValidationResult(is_valid=True)
     
@@ -125,32 +124,40 @@ def validate_metadata_completeness(
             )
             return result
         
-        # Agrupar datos por instrumentos
-        instruments = _get_instruments_from_data(data, categorization)
+        # Agrupar datos por instrumentos (posiciones de fila, sin sub-DataFrames)
+        instruments = instrument_indices(data, categorization, instrument_positions)
         
         # Estructura nueva: análisis por instrumento
         instruments_analysis = {}
         overall_missing = 0
         overall_observations = 0
         
-        for instrument_key, instrument_data in instruments.items():
+        # Todos los instrumentos comparten las columnas de data: separar variables una sola vez
+        columns = set(data.columns)
+        present_vars = [var for var in categorization.metadata_vars if var in columns]
+        missing_vars = [var for var in categorization.metadata_vars if var not in columns]
+        
+        # Una factorización por variable sobre la base completa; cada instrumento solo cuenta sus códigos
+        var_codes = {var: _factorize_labels(data[var]) for var in present_vars}
+        
+        for instrument_key, positions in instruments.items():
             instrument_analysis = {
-                'total_observations': len(instrument_data),
+                'total_observations': len(positions),
                 'variables_analysis': {}
             }
             
-            for var in categorization.metadata_vars:
-                if var not in instrument_data.columns:
-                    result.add_error(
-                        f"Variable crítica '{var}' no encontrada en el instrumento {instrument_key}",
-                        "METADATA_VAR_NOT_FOUND",
-                        "error",
-                        variable=var,
-                        instrument=instrument_key
-                    )
-                    continue
-                
-                var_analysis = _analyze_variable_by_instrument(instrument_data, var)
+            for var in missing_vars:
+                result.add_error(
+                    f"Variable crítica '{var}' no encontrada en el instrumento {instrument_key}",
+                    "METADATA_VAR_NOT_FOUND",
+                    "error",
+                    variable=var,
+                    instrument=instrument_key
+                )
+            
+            for var in present_vars:
+                codes, labels = var_codes[var]
+                var_analysis = _analyze_variable_by_instrument(codes[positions], labels)
                 instrument_analysis['variables_analysis'][var] = var_analysis
                 
                 # Acumular estadísticas generales
@@ -6,6 +6,9 @@ Constantes para el toolkit de ensamblaje
 SINGLE_INSTRUMENT_KEY = "default_instrument"
 SINGLE_INSTRUMENT_DISPLAY = "Toda la base de datos"
 
+# Máximo de índices de fila reportados por variable con celdas vacías (el conteo total va en statistics)
+MAX_REPORTED_EMPTY_CELLS = 100
+
 def get_instrument_display_name(instrument_key: str) -> str:
     """Convierte clave técnica de instrumento a nombre amigable para el usuario"""
     if instrument_key == SINGLE_INSTRUMENT_KEY:
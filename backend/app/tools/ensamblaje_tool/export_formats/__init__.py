@@ -3,10 +3,17 @@ Módulos de exportación modular para el ToolKit de Ensamblaje
 """
 from .normalized_excel_exporter import NormalizedExcelExporter
 from .validation_excel_exporter import ValidationExcelExporter
-from .pdf_report_exporter import PDFReportExporter
 
 __all__ = [
     'NormalizedExcelExporter',
     'ValidationExcelExporter', 
     'PDFReportExporter'
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    # PDFReportExporter arrastra reportlab/platypus: se importa recién cuando se pide un PDF
+    if name == 'PDFReportExporter':
+        from .pdf_report_exporter import PDFReportExporter
+        return PDFReportExporter
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -8,6 +8,22 @@ from typing import Dict, Any
 from datetime import datetime
 from ....core.models import VariableCategorization
 
+# Optional streaming-oriented xlsx writer (lighter per-cell objects); falls back to openpyxl
+try:
+    import xlsxwriter  # noqa: F401
+    XLSXWRITER_AVAILABLE = True
+except ImportError:
+    XLSXWRITER_AVAILABLE = False
+
+# Descripción de cada categoría en la hoja de mapeo (constante: no se reconstruye por variable)
+CATEGORY_DESCRIPTIONS = {
+    'Instrumento': 'Variables que identifican y distinguen diferentes instrumentos',
+    'Identificador de Ítem': 'Variables que identifican únicamente cada ítem',
+    'Metadata de Ítem': 'Variables con información técnica del ítem (debe estar completa)',
+    'Clasificación de Ítem': 'Variables que clasifican o describen el contenido del ítem',
+    'Otras Variables': 'Variables no categorizadas'
+}
+
 
 class NormalizedExcelExporter:
     """Exportador específico para datos normalizados a Excel"""
@@ -34,7 +50,7 @@ class NormalizedExcelExporter:
             temp_dir = tempfile.gettempdir()
             file_path = os.path.join(temp_dir, filename)
             
-            with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
+            with self._create_writer(file_path) as writer:
                 # Sheet 1: Datos normalizados
                 normalized_data.to_excel(writer, sheet_name='Datos_Normalizados', index=False)
                 
@@ -64,40 +80,43 @@ class NormalizedExcelExporter:
                 'error': str(e)
             }
     
+    def _create_writer(self, file_path: str) -> pd.ExcelWriter:
+        """
+        ExcelWriter para el export: xlsxwriter si está disponible, openpyxl en otro caso
+        
+        No se usa constant_memory: to_excel escribe las celdas por columna y ese modo
+        solo conserva la fila actual, por lo que se perderían datos.
+        """
+        if XLSXWRITER_AVAILABLE:
+            return pd.ExcelWriter(
+                file_path,
+                engine='xlsxwriter',
+                engine_kwargs={'options': {'strings_to_urls': False}}
+            )
+        return pd.ExcelWriter(file_path, engine='openpyxl')
+    
     def _normalize_column_names(self, data: pd.DataFrame, categorization: VariableCategorization) -> Dict[str, str]:
         """Normalizar nombres de columnas y devolver mapeo"""
         name_mapping = {}
         
-        # Renombrar variables por categoría
-        for i, var in enumerate(categorization.instrument_vars, 1):
-            if var in data.columns:
-                new_name = f'var_instrumento{i}'
-                data.rename(columns={var: new_name}, inplace=True)
-                name_mapping[var] = new_name
-        
-        for i, var in enumerate(categorization.item_id_vars, 1):
-            if var in data.columns:
-                new_name = f'id_item{i}' if i == 1 else f'id_item{i}'
-                data.rename(columns={var: new_name}, inplace=True)
-                name_mapping[var] = new_name
-        
-        for i, var in enumerate(categorization.metadata_vars, 1):
-            if var in data.columns:
-                new_name = f'var_metadata{i}'
-                data.rename(columns={var: new_name}, inplace=True)
-                name_mapping[var] = new_name
+        # Prefijo del nombre normalizado por categoría
+        category_prefixes = [
+            (categorization.instrument_vars, 'var_instrumento'),
+            (categorization.item_id_vars, 'id_item'),
+            (categorization.metadata_vars, 'var_metadata'),
+            (categorization.classification_vars, 'var_clasificacion'),
+            (categorization.other_vars, 'var_otra')
+        ]
         
-        for i, var in enumerate(categorization.classification_vars, 1):
-            if var in data.columns:
-                new_name = f'var_clasificacion{i}'
-                data.rename(columns={var: new_name}, inplace=True)
-                name_mapping[var] = new_name
+        # Armar el mapeo completo sin tocar data; una variable ya renombrada conserva su primer nombre
+        columns = set(data.columns)
+        for variables, prefix in category_prefixes:
+            for i, var in enumerate(variables, 1):
+                if var in columns and var not in name_mapping:
+                    name_mapping[var] = f'{prefix}{i}'
         
-        for i, var in enumerate(categorization.other_vars, 1):
-            if var in data.columns:
-                new_name = f'var_otra{i}'
-                data.rename(columns={var: new_name}, inplace=True)
-                name_mapping[var] = new_name
+        # Renombrar variables por categoría con un único rename (un solo rebuild del Index)
+        data.rename(columns=name_mapping, inplace=True)
         
         return name_mapping
     
@@ -105,8 +124,11 @@ class NormalizedExcelExporter:
         """Crear DataFrame con el mapeo de variables"""
         mapping_data = []
         
+        # Categoría de cada variable construida una vez: búsqueda O(1) por fila del mapeo
+        category_by_variable = self._get_category_lookup(categorization)
+        
         for original, normalized in name_mapping.items():
-            category = self._get_category(original, categorization)
+            category = category_by_variable.get(original, 'Sin categoría')
             description = self._get_category_description(category)
             
             mapping_data.append({
@@ -118,30 +140,25 @@ class NormalizedExcelExporter:
         
         return pd.DataFrame(mapping_data)
     
-    def _get_category(self, variable: str, categorization: VariableCategorization) -> str:
-        """Obtener categoría de una variable"""
-        if variable in categorization.instrument_vars:
-            return 'Instrumento'
-        elif variable in categorization.item_id_vars:
-            return 'Identificador de Ítem'
-        elif variable in categorization.metadata_vars:
-            return 'Metadata de Ítem'
-        elif variable in categorization.classification_vars:
-            return 'Clasificación de Ítem'
-        elif variable in categorization.other_vars:
-            return 'Otras Variables'
-        return 'Sin categoría'
+    def _get_category_lookup(self, categorization: VariableCategorization) -> Dict[str, str]:
+        """Obtener categoría de cada variable (gana la primera categoría en la que aparece)"""
+        category_by_variable = {}
+        
+        for variables, category in [
+            (categorization.instrument_vars, 'Instrumento'),
+            (categorization.item_id_vars, 'Identificador de Ítem'),
+            (categorization.metadata_vars, 'Metadata de Ítem'),
+            (categorization.classification_vars, 'Clasificación de Ítem'),
+            (categorization.other_vars, 'Otras Variables')
+        ]:
+            for variable in variables:
+                category_by_variable.setdefault(variable, category)
+        
+        return category_by_variable
     
     def _get_category_description(self, category: str) -> str:
         """Obtener descripción de categoría"""
-        descriptions = {
-            'Instrumento': 'Variables que identifican y distinguen diferentes instrumentos',
-            'Identificador de Ítem': 'Variables que identifican únicamente cada ítem',
-            'Metadata de Ítem': 'Variables con información técnica del ítem (debe estar completa)',
-            'Clasificación de Ítem': 'Variables que clasifican o describen el contenido del ítem',
-            'Otras Variables': 'Variables no categorizadas'
-        }
-        return descriptions.get(category, 'Sin descripción')
+        return CATEGORY_DESCRIPTIONS.get(category, 'Sin descripción')
     
     def _get_db_manager(self):
         """Get database manager instance"""
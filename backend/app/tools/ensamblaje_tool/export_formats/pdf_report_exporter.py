@@ -5,16 +5,16 @@ Diseño modular con branding institucional y análisis completo
 import os
 import tempfile
 import json
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, BinaryIO
 from datetime import datetime
-from io import BytesIO
+from itertools import chain
 
 from reportlab.lib.pagesizes import A4, letter
 from reportlab.lib.units import inch, cm, mm
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
 from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle,
+    SimpleDocTemplate, Paragraph, Spacer, Table, LongTable, TableStyle,
     PageBreak, Image, KeepTogether, Flowable
 )
 from reportlab.pdfgen import canvas
@@ -30,6 +30,48 @@ from ....core.assets.brand import (
 )
 
 
+# Estilos de tabla compartidos (inmutables): se construyen una vez por proceso en lugar de en cada reporte
+# Caja de encabezado de instrumento (secciones de duplicados y completitud)
+_INSTRUMENT_HEADER_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, -1), BRAND_COLORS['primary']),
+    ('TEXTCOLOR', (0, 0), (-1, -1), BRAND_COLORS['surface']),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('TOPPADDING', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+    ('LEFTPADDING', (0, 0), (-1, -1), 12),
+])
+
+# Caja de encabezado de instrumento (análisis detallado por instrumento)
+_INSTRUMENT_DETAIL_HEADER_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, -1), BRAND_COLORS['primary']),
+    ('TEXTCOLOR', (0, 0), (-1, -1), BRAND_COLORS['surface']),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('TOPPADDING', (0, 0), (-1, -1), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+    ('LEFTPADDING', (0, 0), (-1, -1), 15),
+])
+
+# Tabla de valores repetidos por variable de ID
+_REPEATED_DETAILS_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), BRAND_COLORS['table_header']),
+    ('TEXTCOLOR', (0, 0), (-1, 0), BRAND_COLORS['surface']),
+    ('FONTNAME', (0, 0), (-1, 0), TYPOGRAPHY['font_family_bold']),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [BRAND_COLORS['table_row_odd'], BRAND_COLORS['table_row_even']]),
+    ('GRID', (0, 0), (-1, -1), 0.5, BRAND_COLORS['divider']),
+])
+
+# Línea divisoria entre instrumentos
+_INSTRUMENT_DIVIDER_STYLE = TableStyle([
+    ('LINEABOVE', (0, 0), (-1, 0), 1, BRAND_COLORS['divider']),
+])
+
+
+# Fragmentos ya parseados de párrafos con texto literal, por (texto, estilo): evita re-parsear el XML en cada reporte
+_STATIC_PARAGRAPH_FRAGS: Dict[Tuple[str, str], List] = {}
+
+
 class SimpleNumberedCanvas(canvas.Canvas):
     """Canvas with page numbers (without total pages to maintain bookmark compatibility)"""
 
@@ -106,6 +148,28 @@ class PDFReportExporter:
 
         story.append(BookmarkFlowable(title, level))
 
+    def _static_paragraph(self, text: str, style_name: str) -> Paragraph:
+        """
+        Crear Paragraph de texto literal reutilizando sus fragmentos parseados
+        
+        Args:
+            text: Texto fijo (sin valores dinámicos) con el markup de ReportLab
+            style_name: Nombre del estilo en self.styles
+            
+        Returns:
+            Paragraph nuevo (cada flowable se usa una sola vez en el story)
+        """
+        style = self.styles[style_name]
+        frags = _STATIC_PARAGRAPH_FRAGS.get((text, style_name))
+        
+        if frags is None:
+            paragraph = Paragraph(text, style)
+            _STATIC_PARAGRAPH_FRAGS[(text, style_name)] = [frag.clone() for frag in paragraph.frags]
+            return paragraph
+        
+        # Clonar los fragmentos: el layout puede anotarlos durante doc.build
+        return Paragraph(text, style, frags=[frag.clone() for frag in frags])
+
     def _create_info_box(self, title: str, content: str, bg_color, text_color=None) -> Table:
         """Crear caja de información destacada"""
         if text_color is None:
@@ -149,22 +213,30 @@ class PDFReportExporter:
             if isinstance(categorization_dict, str):
                 categorization_dict = json.loads(categorization_dict)
 
+            # Un solo timestamp por exportación; la fecha de análisis es la del resumen de validación
+            generated_at = datetime.now()
+
             # Extract file metadata
             file_metadata = {
                 'original_filename': validation_session.get('filename', 'Archivo no especificado'),
                 'sheet_name': validation_session.get('sheet_name'),
-                'analysis_date': datetime.now()
+                'analysis_date': self._get_analysis_date(validation_results, generated_at),
+                'generated_at': generated_at
             }
 
-            filename = f"reporte_validacion_{validation_session_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+            filename = f"reporte_validacion_{validation_session_id}_{generated_at.strftime('%Y%m%d_%H%M%S')}.pdf"
             temp_dir = tempfile.gettempdir()
             file_path = os.path.join(temp_dir, filename)
 
-            # Generate PDF
-            buffer = self._generate_pdf_buffer(validation_results, categorization_dict, file_metadata)
-
-            with open(file_path, 'wb') as f:
-                f.write(buffer.getvalue())
+            # Generate PDF directly into the export file (sin buffer intermedio en memoria)
+            try:
+                with open(file_path, 'wb') as f:
+                    self._write_pdf(f, validation_results, categorization_dict, file_metadata)
+            except Exception:
+                # No dejar un PDF a medio escribir en el directorio temporal
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+                raise
 
             # Register in database
             export_id = self.db.create_export_record(
@@ -190,12 +262,21 @@ class PDFReportExporter:
                 'traceback': traceback.format_exc()
             }
 
-    def _generate_pdf_buffer(self, validation_data: Dict, categorization: Dict, file_metadata: Dict) -> BytesIO:
-        """Generar buffer PDF con diseño profesional completo"""
-        buffer = BytesIO()
-
+    def _write_pdf(
+        self,
+        stream: BinaryIO,
+        validation_data: Dict,
+        categorization: Dict,
+        file_metadata: Dict
+    ) -> None:
+        """
+        Generar PDF con diseño profesional completo
+        
+        Args:
+            stream: Archivo binario abierto donde escribir el PDF
+        """
         doc = SimpleDocTemplate(
-            buffer,
+            stream,
             pagesize=A4,
             rightMargin=40,
             leftMargin=40,
@@ -242,12 +323,10 @@ class PDFReportExporter:
         story.append(PageBreak())
 
         # 10. Conclusions and recommendations
-        story.extend(self._create_conclusions_section(validation_data))
+        story.extend(self._create_conclusions_section(validation_data, file_metadata))
 
         # Build PDF with custom canvas (SimpleNumberedCanvas allows bookmarks to work)
         doc.build(story, canvasmaker=SimpleNumberedCanvas)
-        buffer.seek(0)
-        return buffer
 
     def _create_styles(self) -> Dict[str, ParagraphStyle]:
         """Crear estilos personalizados para el PDF"""
@@ -488,7 +567,7 @@ class PDFReportExporter:
         """Crear tabla de contenidos profesional con bookmarks"""
         story = []
 
-        story.append(Paragraph("Tabla de Contenidos", self.styles['Heading1']))
+        story.append(self._static_paragraph("Tabla de Contenidos", 'Heading1'))
         story.append(Spacer(1, 20))
 
         # Propósito del documento
@@ -530,7 +609,7 @@ class PDFReportExporter:
 
         # Bookmark para navegación
         self._add_bookmark(story, "1. Resumen Ejecutivo", 0)
-        story.append(Paragraph('1. Resumen Ejecutivo', self.styles['Heading1']))
+        story.append(self._static_paragraph('1. Resumen Ejecutivo', 'Heading1'))
         story.append(Spacer(1, 15))
 
         summary = validation_data.get('summary', {})
@@ -579,13 +658,13 @@ class PDFReportExporter:
 
         # Problems summary table
         problems_data = [
-            [Paragraph("<b>Tipo de Problema</b>", self.styles['Body']),
-             Paragraph("<b>Cantidad</b>", self.styles['Body'])],
-            [Paragraph("Valores Duplicados", self.styles['Body']),
+            [self._static_paragraph("<b>Tipo de Problema</b>", 'Body'),
+             self._static_paragraph("<b>Cantidad</b>", 'Body')],
+            [self._static_paragraph("Valores Duplicados", 'Body'),
              Paragraph(f"{total_duplicates:,}", self.styles['Body'])],
-            [Paragraph("Valores Faltantes", self.styles['Body']),
+            [self._static_paragraph("Valores Faltantes", 'Body'),
              Paragraph(f"{total_missing:,}", self.styles['Body'])],
-            [Paragraph("<b>TOTAL DE PROBLEMAS</b>", self.styles['Body']),
+            [self._static_paragraph("<b>TOTAL DE PROBLEMAS</b>", 'Body'),
              Paragraph(f"<b>{total_problems:,}</b>", self.styles['Body'])],
         ]
 
@@ -608,7 +687,7 @@ class PDFReportExporter:
         story.append(Spacer(1, 20))
 
         # Recomendaciones dinámicas
-        story.append(Paragraph("Recomendaciones", self.styles['Heading2']))
+        story.append(self._static_paragraph("Recomendaciones", 'Heading2'))
         story.append(Spacer(1, 10))
 
         recommendations = self._generate_recommendations(validation_data)
@@ -660,7 +739,7 @@ class PDFReportExporter:
         story = []
 
         self._add_bookmark(story, "2. Categorización de Variables", 0)
-        story.append(Paragraph('2. Categorización de Variables', self.styles['Heading1']))
+        story.append(self._static_paragraph('2. Categorización de Variables', 'Heading1'))
         story.append(Spacer(1, 15))
 
         story.append(Paragraph(
@@ -714,7 +793,7 @@ class PDFReportExporter:
         story = []
 
         self._add_bookmark(story, "3. Descripción de Instrumentos", 0)
-        story.append(Paragraph('3. Descripción de Instrumentos', self.styles['Heading1']))
+        story.append(self._static_paragraph('3. Descripción de Instrumentos', 'Heading1'))
         story.append(Spacer(1, 15))
 
         instrument_validation = validation_data.get('instrument_validation', {})
@@ -751,7 +830,7 @@ class PDFReportExporter:
         story = []
 
         self._add_bookmark(story, "4. Validación de Duplicados", 0)
-        story.append(Paragraph('4. Validación de Duplicados', self.styles['Heading1']))
+        story.append(self._static_paragraph('4. Validación de Duplicados', 'Heading1'))
         story.append(Spacer(1, 15))
 
         dup_validation = validation_data.get('duplicate_validation', {})
@@ -776,7 +855,7 @@ class PDFReportExporter:
             instruments_analysis = statistics.get('instruments_analysis', {})
 
             if instruments_analysis:
-                story.append(Paragraph("Análisis Detallado por Instrumento:", self.styles['Heading2']))
+                story.append(self._static_paragraph("Análisis Detallado por Instrumento:", 'Heading2'))
                 story.append(Spacer(1, 10))
 
                 for instrument_key, analysis in instruments_analysis.items():
@@ -788,14 +867,7 @@ class PDFReportExporter:
                         [[Paragraph(f"<b>Instrumento: {instrument_display}</b>", self.styles['InstrumentName'])]],
                         colWidths=[6.5*inch]
                     )
-                    inst_header.setStyle(TableStyle([
-                        ('BACKGROUND', (0, 0), (-1, -1), BRAND_COLORS['primary']),
-                        ('TEXTCOLOR', (0, 0), (-1, -1), BRAND_COLORS['surface']),
-                        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                        ('TOPPADDING', (0, 0), (-1, -1), 10),
-                        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-                        ('LEFTPADDING', (0, 0), (-1, -1), 12),
-                    ]))
+                    inst_header.setStyle(_INSTRUMENT_HEADER_STYLE)
                     story.append(inst_header)
                     story.append(Spacer(1, 8))
 
@@ -809,15 +881,20 @@ class PDFReportExporter:
                                 self.styles['Body']
                             ))
 
-                            # Mostrar TODOS los detalles sin límite
+                            # Mostrar TODOS los detalles sin límite: celdas de texto plano
+                            # (sin Paragraph por fila) en una LongTable que pagina eficientemente
                             repeated_details = var_data.get('repeated_details', [])
-                            for detail in repeated_details:
-                                value = detail.get('value', '')
-                                count = detail.get('count', 0)
-                                story.append(Paragraph(
-                                    f"    - Valor '{value}' repetido {count} veces",
-                                    self.styles['Body']
-                                ))
+                            if repeated_details:
+                                details_data = [['Valor', 'Veces repetido']]
+                                details_data.extend(
+                                    [str(detail.get('value', '')), f"{detail.get('count', 0):,}"]
+                                    for detail in repeated_details
+                                )
+                                details_table = LongTable(details_data, colWidths=[4.5*inch, 1.5*inch], repeatRows=1)
+                                details_table.setStyle(_REPEATED_DETAILS_STYLE)
+                                story.append(Spacer(1, 4))
+                                story.append(details_table)
+                                story.append(Spacer(1, 6))
 
                     story.append(Spacer(1, 10))
 
@@ -828,7 +905,7 @@ class PDFReportExporter:
         story = []
 
         self._add_bookmark(story, "5. Validación de Información Crítica", 0)
-        story.append(Paragraph('5. Validación de Información Crítica', self.styles['Heading1']))
+        story.append(self._static_paragraph('5. Validación de Información Crítica', 'Heading1'))
         story.append(Spacer(1, 15))
 
         meta_validation = validation_data.get('metadata_validation', {})
@@ -854,7 +931,7 @@ class PDFReportExporter:
             instruments_analysis = statistics.get('instruments_analysis', {})
 
             if instruments_analysis:
-                story.append(Paragraph("Completitud por Instrumento:", self.styles['Heading2']))
+                story.append(self._static_paragraph("Completitud por Instrumento:", 'Heading2'))
                 story.append(Spacer(1, 10))
 
                 for instrument_key, analysis in instruments_analysis.items():
@@ -865,14 +942,7 @@ class PDFReportExporter:
                         [[Paragraph(f"<b>Instrumento: {instrument_display}</b>", self.styles['InstrumentName'])]],
                         colWidths=[6.5*inch]
                     )
-                    inst_header.setStyle(TableStyle([
-                        ('BACKGROUND', (0, 0), (-1, -1), BRAND_COLORS['primary']),
-                        ('TEXTCOLOR', (0, 0), (-1, -1), BRAND_COLORS['surface']),
-                        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                        ('TOPPADDING', (0, 0), (-1, -1), 10),
-                        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-                        ('LEFTPADDING', (0, 0), (-1, -1), 12),
-                    ]))
+                    inst_header.setStyle(_INSTRUMENT_HEADER_STYLE)
                     story.append(inst_header)
                     story.append(Spacer(1, 10))
 
@@ -900,7 +970,7 @@ class PDFReportExporter:
         story = []
 
         self._add_bookmark(story, "6. Análisis de Variables de Clasificación", 0)
-        story.append(Paragraph('6. Análisis de Variables de Clasificación', self.styles['Heading1']))
+        story.append(self._static_paragraph('6. Análisis de Variables de Clasificación', 'Heading1'))
         story.append(Spacer(1, 15))
 
         class_validation = validation_data.get('classification_validation', {})
@@ -930,7 +1000,7 @@ class PDFReportExporter:
         story = []
 
         self._add_bookmark(story, "7. Análisis Detallado por Instrumento", 0)
-        story.append(Paragraph('7. Análisis Detallado por Instrumento', self.styles['Heading1']))
+        story.append(self._static_paragraph('7. Análisis Detallado por Instrumento', 'Heading1'))
         story.append(Spacer(1, 15))
 
         # Extract instrument analysis from both duplicate and metadata validations
@@ -940,8 +1010,8 @@ class PDFReportExporter:
         dup_instruments = dup_validation.get('statistics', {}).get('instruments_analysis', {})
         meta_instruments = meta_validation.get('statistics', {}).get('instruments_analysis', {})
 
-        # Combine instruments
-        all_instruments = set(list(dup_instruments.keys()) + list(meta_instruments.keys()))
+        # Combine instruments (sin materializar listas intermedias, en orden de aparición)
+        all_instruments = dict.fromkeys(chain(dup_instruments, meta_instruments))
 
         if not all_instruments:
             story.append(Paragraph(
@@ -958,14 +1028,7 @@ class PDFReportExporter:
                 [[Paragraph(f"<b>Instrumento: {instrument_display}</b>", self.styles['InstrumentName'])]],
                 colWidths=[6.5*inch]
             )
-            inst_header.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, -1), BRAND_COLORS['primary']),
-                ('TEXTCOLOR', (0, 0), (-1, -1), BRAND_COLORS['surface']),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('TOPPADDING', (0, 0), (-1, -1), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-                ('LEFTPADDING', (0, 0), (-1, -1), 15),
-            ]))
+            inst_header.setStyle(_INSTRUMENT_DETAIL_HEADER_STYLE)
             story.append(inst_header)
             story.append(Spacer(1, 12))
 
@@ -999,7 +1062,7 @@ class PDFReportExporter:
                 vars_analysis = meta_analysis.get('variables_analysis', {})
 
                 if vars_analysis:
-                    story.append(Paragraph("<b>Completitud de Variables Críticas:</b>", self.styles['Body']))
+                    story.append(self._static_paragraph("<b>Completitud de Variables Críticas:</b>", 'Body'))
                     story.append(Spacer(1, 5))
 
                     for var, var_data in vars_analysis.items():
@@ -1019,20 +1082,18 @@ class PDFReportExporter:
             story.append(Spacer(1, 20))
             # Línea separadora horizontal usando tabla
             divider = Table([['']], colWidths=[6.5*inch])
-            divider.setStyle(TableStyle([
-                ('LINEABOVE', (0, 0), (-1, 0), 1, BRAND_COLORS['divider']),
-            ]))
+            divider.setStyle(_INSTRUMENT_DIVIDER_STYLE)
             story.append(divider)
             story.append(Spacer(1, 15))
 
         return story
 
-    def _create_conclusions_section(self, validation_data: Dict) -> List:
+    def _create_conclusions_section(self, validation_data: Dict, file_metadata: Dict) -> List:
         """Crear sección de conclusiones y recomendaciones"""
         story = []
 
         self._add_bookmark(story, "8. Conclusiones y Recomendaciones", 0)
-        story.append(Paragraph('8. Conclusiones y Recomendaciones', self.styles['Heading1']))
+        story.append(self._static_paragraph('8. Conclusiones y Recomendaciones', 'Heading1'))
         story.append(Spacer(1, 15))
 
         summary = validation_data.get('summary', {})
@@ -1058,7 +1119,7 @@ class PDFReportExporter:
         story.append(Spacer(1, 15))
 
         # Recomendaciones
-        story.append(Paragraph("<b>Recomendaciones:</b>", self.styles['Heading2']))
+        story.append(self._static_paragraph("<b>Recomendaciones:</b>", 'Heading2'))
         story.append(Spacer(1, 10))
 
         recommendations = self._generate_recommendations(validation_data)
@@ -1076,8 +1137,9 @@ class PDFReportExporter:
         ]))
         story.append(divider)
         story.append(Spacer(1, 10))
+        generated_at = file_metadata.get('generated_at') or datetime.now()
         story.append(Paragraph(
-            f"<b>Reporte generado el:</b> {datetime.now().strftime('%d/%m/%Y a las %H:%M')}<br/>"
+            f"<b>Reporte generado el:</b> {generated_at.strftime('%d/%m/%Y a las %H:%M')}<br/>"
             f"<b>Sistema:</b> Validador de Bases de Datos de Ensamblaje<br/>"
             f"<b>Institución:</b> {BRAND_NAME}",
             self.styles['Body']
@@ -1118,6 +1180,26 @@ class PDFReportExporter:
         drawing.add(chart)
         return drawing
 
+    def _get_analysis_date(self, validation_data: Dict, fallback: datetime) -> datetime:
+        """
+        Obtener la fecha de análisis desde summary.timestamp del reporte de validación
+        
+        Args:
+            validation_data: Resultados de validación (dict serializado del ValidationReport)
+            fallback: Fecha a usar si el resumen no trae un timestamp válido
+            
+        Returns:
+            Fecha en que se generó el reporte de validación
+        """
+        timestamp = validation_data.get('summary', {}).get('timestamp')
+        if not timestamp:
+            return fallback
+        
+        try:
+            return datetime.fromisoformat(timestamp)
+        except (TypeError, ValueError):
+            return fallback
+
     def _format_instrument_name(self, instrument_key: str, validation_data: Dict) -> str:
         """
         Formatear nombre de instrumento usando el display_name inteligente
@@ -1136,14 +1218,12 @@ class PDFReportExporter:
                 return display_name
 
         # Fallback al formato técnico si no se encuentra el display_name
-        parts = instrument_key.split('|')
-        formatted_parts = []
-        for part in parts:
-            if ':' in part:
-                key, value = part.split(':', 1)
-                formatted_parts.append(f"{key}: {value}")
-
-        return ", ".join(formatted_parts) if formatted_parts else instrument_key
+        formatted = ", ".join(
+            f"{key}: {value}"
+            for key, _, value in (part.partition(':') for part in instrument_key.split('|') if ':' in part)
+        )
+
+        return formatted or instrument_key
 
     def _get_db_manager(self):
         """Get database manager instance"""
@@ -2,6 +2,7 @@
 Exportador de Excel de validación - Versión 2.0 con coloreo de celdas y columnas val_*
 """
 import pandas as pd
+import numpy as np
 import os
 import tempfile
 import json
@@ -11,6 +12,7 @@ from openpyxl import load_workbook
 from openpyxl.styles import PatternFill, Font
 from ....core.models import VariableCategorization
 from ....core.services.file_handling.file_parser import FileParser
+from ...common_checks.instrument_groups import instrument_indices
 
 
 # Colores de categorías (idénticos al frontend)
@@ -132,39 +134,35 @@ class ValidationExcelExporter:
         problems = {}
 
         # 1. Detectar duplicados en item_id_vars
+        # Posiciones de fila de cada instrumento, calculadas una vez para todas las variables de ID
+        instrument_positions = None
+
         for var in categorization.item_id_vars:
             if var not in data.columns:
                 continue
 
             problems[var] = {}
 
-            # Agrupar por instrument_vars si existen
-            if categorization.instrument_vars:
-                instruments = self._group_by_instruments(data, categorization)
-                for instrument_key, instrument_data in instruments.items():
-                    if var in instrument_data.columns:
-                        # Encontrar valores duplicados
-                        non_null = instrument_data[var].dropna()
-                        value_counts = non_null.value_counts()
-                        duplicated_values = value_counts[value_counts > 1].index
-
-                        # Marcar todas las filas con valores duplicados
-                        for dup_val in duplicated_values:
-                            mask = instrument_data[var] == dup_val
-                            dup_indices = instrument_data[mask].index.tolist()
-                            for idx in dup_indices:
-                                problems[var][idx] = 'DUPLICADO'
-            else:
-                # Sin instrumentos, buscar duplicados en toda la data
-                non_null = data[var].dropna()
-                value_counts = non_null.value_counts()
-                duplicated_values = value_counts[value_counts > 1].index
-
-                for dup_val in duplicated_values:
-                    mask = data[var] == dup_val
-                    dup_indices = data[mask].index.tolist()
-                    for idx in dup_indices:
-                        problems[var][idx] = 'DUPLICADO'
+            if instrument_positions is None:
+                instrument_positions = self._get_instrument_positions(data, categorization)
+
+            # IDs como Categorical: un solo hash por columna, los duplicados se cuentan sobre códigos enteros
+            column = data[var]
+            if not isinstance(column.dtype, pd.CategoricalDtype):
+                column = column.astype('category')
+            codes = column.cat.codes.to_numpy()
+
+            for positions in instrument_positions:
+                # Conteo solo entre los códigos del instrumento (no sobre todas las categorías de la columna)
+                instrument_codes = codes[positions]
+                present = instrument_codes >= 0
+                _, inverse, counts = np.unique(instrument_codes[present], return_inverse=True, return_counts=True)
+                is_duplicated = np.zeros(len(positions), dtype=bool)
+                is_duplicated[present] = counts[inverse] > 1
+
+                # Marcar todas las filas con valores duplicados
+                for idx in data.index[positions[is_duplicated]]:
+                    problems[var][idx] = 'DUPLICADO'
 
             # Detectar valores faltantes en item_id_vars (igual que metadata_vars)
             missing_mask = data[var].isna()
@@ -350,36 +348,13 @@ class ValidationExcelExporter:
 
         wb.save(file_path)
 
-    def _group_by_instruments(
+    def _get_instrument_positions(
         self,
         data: pd.DataFrame,
         categorization: VariableCategorization
-    ) -> Dict[str, pd.DataFrame]:
-        """Agrupar datos por instrumentos"""
-        if not categorization.instrument_vars:
-            return {'default': data}
-
-        instruments = {}
-
-        for idx, row in data.iterrows():
-            instrument_values = {}
-            for var in categorization.instrument_vars:
-                if var in data.columns:
-                    instrument_values[var] = str(row[var])
-
-            instrument_key = '|'.join([f"{k}:{v}" for k, v in sorted(instrument_values.items())])
-
-            if instrument_key not in instruments:
-                instruments[instrument_key] = []
-
-            instruments[instrument_key].append(row.to_dict())
-
-        # Convert to DataFrames
-        result = {}
-        for key, rows in instruments.items():
-            result[key] = pd.DataFrame(rows)
-
-        return result
+    ) -> List[np.ndarray]:
+        """Posiciones de fila (iloc) de cada instrumento, sin construir sub-DataFrames"""
+        return list(instrument_indices(data, categorization).values())
 
     def _create_validation_summary_sheet(
         self,
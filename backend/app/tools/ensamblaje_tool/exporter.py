@@ -6,8 +6,7 @@ from typing import Dict, Any
 from ...core.models import VariableCategorization
 from .export_formats import (
     NormalizedExcelExporter,
-    ValidationExcelExporter,
-    PDFReportExporter
+    ValidationExcelExporter
 )
 
 
@@ -66,6 +65,8 @@ class EnsamblajeExporter:
                     'error': 'validation_session_id requerido para exportación de reporte PDF'
                 }
             
+            # Import diferido: reportlab solo se carga cuando se exporta un PDF
+            from .export_formats.pdf_report_exporter import PDFReportExporter
             exporter = PDFReportExporter(self.session_id)
             return exporter.export(validation_session_id)
             
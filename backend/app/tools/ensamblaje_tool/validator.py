@@ -11,9 +11,11 @@ from ...core.models import (
 )
 from .checks.check_instruments import validate_instruments_identification
 from ..common_checks.check_duplicates import validate_duplicates
+from ..common_checks.instrument_groups import (
+    get_present_instrument_vars, get_instrument_positions, instrument_indices
+)
 from .checks.check_metadata import validate_metadata_completeness
 from .checks.check_classification import analyze_classification_variables
-from .constants import SINGLE_INSTRUMENT_KEY
 
 class EnsamblajeValidator:
     """
@@ -32,12 +34,21 @@ class EnsamblajeValidator:
         """
         Generar reporte completo orquestando checks específicos
         """
+        # Calcular una sola vez por reporte (también usado por el reporte de error)
+        total_items = len(data)
+        
         try:
+            # Agrupar una sola vez por reporte: el conteo de instrumentos y los checks de instrumentos,
+            # duplicados, variables críticas y clasificación comparten las posiciones por instrumento
+            # (sin sub-DataFrames)
+            instrument_positions = get_instrument_positions(data, get_present_instrument_vars(data, categorization))
+            total_instruments = len(instrument_indices(data, categorization, instrument_positions))
+            
             # Ejecutar checks específicos (orquestación delgada) - 4 validaciones
-            instrument_validation = validate_instruments_identification(data, categorization)
-            duplicate_validation = validate_duplicates(data, categorization)
-            metadata_validation = validate_metadata_completeness(data, categorization)
-            classification_validation = analyze_classification_variables(data, categorization)
+            instrument_validation = validate_instruments_identification(data, categorization, instrument_positions)
+            duplicate_validation = validate_duplicates(data, categorization, instrument_positions)
+            metadata_validation = validate_metadata_completeness(data, categorization, instrument_positions)
+            classification_validation = analyze_classification_variables(data, categorization, instrument_positions)
             
             # Determinar estado general de validación
             has_errors = (
@@ -62,10 +73,9 @@ class EnsamblajeValidator:
                 validation_status = 'success'
             
             # Crear resumen
-            instruments = self._get_instruments(data, categorization)
             summary = ValidationSummary(
-                total_items=len(data),
-                total_instruments=len(instruments),
+                total_items=total_items,
+                total_instruments=total_instruments,
                 validation_status=validation_status,
                 timestamp=datetime.now().isoformat(),
                 categorization=categorization
@@ -104,7 +114,7 @@ class EnsamblajeValidator:
             )
             
             summary = ValidationSummary(
-                total_items=len(data),
+                total_items=total_items,
                 total_instruments=0,
                 validation_status='error',
                 timestamp=datetime.now().isoformat(),
@@ -118,31 +128,3 @@ class EnsamblajeValidator:
                 metadata_validation=MetadataValidationResult(is_valid=False),
                 classification_validation=ClassificationValidationResult(is_valid=False)
             )
-    
-    def _get_instruments(self, data: pd.DataFrame, categorization: VariableCategorization) -> Dict[str, pd.DataFrame]:
-        """
-        Obtener instrumentos agrupados por variables de instrumento
-        """
-        if not categorization.instrument_vars:
-            return {SINGLE_INSTRUMENT_KEY: data}
-        
-        instrument_groups = {}
-        
-        for _, row in data.iterrows():
-            instrument_values = {}
-            for var in categorization.instrument_vars:
-                if var in data.columns:
-                    instrument_values[var] = str(row[var])
-            
-            instrument_key = '|'.join([f"{k}:{v}" for k, v in sorted(instrument_values.items())])
-            
-            if instrument_key not in instrument_groups:
-                instrument_groups[instrument_key] = []
-            
-            instrument_groups[instrument_key].append(row.to_dict())
-        
-        instruments = {}
-        for key, rows in instrument_groups.items():
-            instruments[key] = pd.DataFrame(rows)
-        
-        return instruments
\ No newline at end of file
@@ -0,0 +1,23 @@
+"""
+Tests for DataFrame cleaning after parsing
+"""
+import numpy as np
+import pandas as pd
+from app.core.services.file_handling.data_cleaner import DataCleaner
+
+class TestCleanDataframe:
+    """Test renaming unnamed columns and reporting empty ones"""
+
+    def test_renames_and_reports_without_copying(self):
+        """Unnamed columns get names, empty columns are kept and the data is not copied"""
+        df = pd.DataFrame({
+            'item': ['i1', 'i2'],
+            'Unnamed: 1': [1.5, 2.5],
+            'vacia': [None, ' ']
+        })
+
+        cleaned, info = DataCleaner().clean_dataframe(df)
+
+        assert list(cleaned.columns) == ['item', 'Sin_Nombre_2', 'vacia']
+        assert info['empty_columns_found'] == ['vacia']
+        assert np.shares_memory(cleaned['Sin_Nombre_2'].to_numpy(), df['Unnamed: 1'].to_numpy())
@@ -0,0 +1,70 @@
+"""
+Tests for parsing uploaded CSV files into DataFrames
+"""
+import pytest
+import numpy as np
+import pandas as pd
+from app.core.services.file_handling import file_parser
+from app.core.services.file_handling.file_parser import FileParser
+
+class TestParseCsv:
+    """Test CSV parsing with encoding and separator detection"""
+
+    def test_blank_cells_are_nan(self, tmp_path):
+        """Empty cells come back as NaN, so instrument keys read 'nan' as before"""
+        file_path = tmp_path / 'datos.csv'
+        file_path.write_text('forma,id_item\nA,i1\n,i2\n', encoding='utf-8')
+
+        data = FileParser().parse_file(str(file_path))
+
+        assert data['forma'].astype(str).tolist() == ['A', 'nan']
+
+    def test_latin1_file(self, tmp_path):
+        """A latin1 file with ';' separators is read and converted to UTF-8"""
+        file_path = tmp_path / 'datos.csv'
+        file_path.write_bytes('forma;dimensión\nA;Geografía\n'.encode('latin1'))
+
+        data = FileParser().parse_file(str(file_path))
+
+        assert list(data.columns) == ['forma', 'dimensión']
+        assert data['dimensión'].tolist() == ['Geografía']
+        assert file_path.read_bytes().decode('utf-8') == 'forma;dimensión\nA;Geografía\n'
+
+
+class TestParseExcel:
+    """Test Excel parsing through calamine"""
+
+    @pytest.fixture
+    def xlsx_path(self, tmp_path):
+        """Workbook with text IDs, integers, whole floats, blanks and dates"""
+        file_path = tmp_path / 'datos.xlsx'
+        pd.DataFrame({
+            'forma': ['A', 'B', None],
+            'id_item': ['001', '002', '003'],
+            'nivel': [1, 2, 3],
+            'puntaje': [1.0, np.nan, 2.5],
+            'fecha': pd.to_datetime(['2020-01-01', None, '2021-01-01'])
+        }).to_excel(file_path, index=False)
+        return str(file_path)
+
+    def test_reads_with_calamine(self, xlsx_path, monkeypatch):
+        """calamine is installed and is the engine used"""
+        engines = []
+        read_excel = pd.read_excel
+
+        def spy(*args, **kwargs):
+            engines.append(kwargs.get('engine'))
+            return read_excel(*args, **kwargs)
+
+        monkeypatch.setattr(file_parser.pd, 'read_excel', spy)
+
+        FileParser().parse_file(xlsx_path)
+
+        assert file_parser.CALAMINE_AVAILABLE
+        assert engines == ['calamine']
+
+    def test_same_frame_as_openpyxl(self, xlsx_path):
+        """Same columns, dtypes and values as pandas' openpyxl reader"""
+        data = FileParser().parse_file(xlsx_path)
+
+        pd.testing.assert_frame_equal(data, pd.read_excel(xlsx_path, engine='openpyxl'))
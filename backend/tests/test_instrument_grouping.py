@@ -0,0 +1,178 @@
+"""
+Tests for instrument grouping shared by the validation checks and exporters
+"""
+import pytest
+import pandas as pd
+import numpy as np
+from app.core.models import VariableCategorization
+from app.tools.common_checks.instrument_groups import (
+    get_instrument_positions, instrument_indices, instrument_mask
+)
+from app.tools.ensamblaje_tool.validator import EnsamblajeValidator
+
+def _keys_by_row_str(data, instrument_vars):
+    """Reference grouping: str() of each value, row by row"""
+    groups = {}
+    for position, (_, row) in enumerate(data.iterrows()):
+        key = '|'.join(f"{var}:{str(row[var])}" for var in instrument_vars)
+        groups.setdefault(key, []).append(position)
+    return groups
+
+def _keys_from_positions(data, instrument_vars):
+    """Grouping from get_instrument_positions, keyed the same way"""
+    return {
+        '|'.join(f"{var}:{values_by_var[var]}" for var in instrument_vars): positions.tolist()
+        for values_by_var, positions in get_instrument_positions(data, instrument_vars)
+    }
+
+class TestGetInstrumentPositions:
+    """Test grouping rows by the text of the instrument variables"""
+
+    def test_missing_markers_keep_their_own_text(self):
+        """None, NaN and NaT are different instruments, joined only with the same text"""
+        data = pd.DataFrame({
+            'forma': pd.Series([None, np.nan, pd.NaT, 'None', 'nan', 'A'], dtype=object),
+            'texto': ['x'] * 6
+        })
+
+        groups = _keys_from_positions(data, ['forma'])
+
+        assert groups == {
+            'forma:None': [0, 3],
+            'forma:nan': [1, 4],
+            'forma:NaT': [2],
+            'forma:A': [5]
+        }
+
+    def test_datetime_blanks_key_as_nat(self):
+        """Empty cells of a datetime column keep the 'NaT' text"""
+        data = pd.DataFrame({'fecha': pd.to_datetime(['2020-01-01', None, '2020-01-01'])})
+
+        groups = _keys_from_positions(data, ['fecha'])
+
+        assert groups == {'fecha:2020-01-01 00:00:00': [0, 2], 'fecha:NaT': [1]}
+
+    def test_values_grouped_by_text(self):
+        """1 and '1' share an instrument; 1.0 and True print differently and do not"""
+        data = pd.DataFrame({'forma': pd.Series([1, '1', 1.0, True, 1], dtype=object)})
+
+        groups = _keys_from_positions(data, ['forma'])
+
+        assert groups == {'forma:1': [0, 1, 4], 'forma:1.0': [2], 'forma:True': [3]}
+
+    def test_key_text_and_order_of_first_appearance(self):
+        """Values per variable come back as text, instruments in order of first appearance"""
+        data = pd.DataFrame({
+            'anio': [2021, 2020, 2021, 2020],
+            'forma': ['B', 'A', 'B', None]
+        })
+
+        groups = get_instrument_positions(data, ['anio', 'forma'])
+
+        assert [values_by_var for values_by_var, _ in groups] == [
+            {'anio': '2021', 'forma': 'B'},
+            {'anio': '2020', 'forma': 'A'},
+            {'anio': '2020', 'forma': 'None'}
+        ]
+        assert [positions.tolist() for _, positions in groups] == [[0, 2], [1], [3]]
+
+    @pytest.mark.parametrize('seed', range(20))
+    def test_matches_row_by_row_str(self, seed):
+        """Same groups and order as building the key with str() on every row"""
+        rng = np.random.default_rng(seed)
+        pool = np.array([None, np.nan, pd.NaT, 'None', 'nan', 'A', 1, '1', 1.0, True], dtype=object)
+        data = pd.DataFrame({
+            'forma': pd.Series(rng.choice(pool, 30), dtype=object),
+            'nivel': rng.choice([1.5, 2.0, np.nan], 30),
+            'fecha': pd.to_datetime(rng.choice(['2020-01-01', None], 30)),
+            'texto': ['x'] * 30
+        })
+        instrument_vars = ['fecha', 'forma', 'nivel']
+
+        expected = _keys_by_row_str(data, instrument_vars)
+        groups = _keys_from_positions(data, instrument_vars)
+
+        assert groups == expected
+        assert list(groups) == list(expected)
+
+    def test_empty_data(self):
+        """No rows, no instruments"""
+        data = pd.DataFrame({'forma': pd.Series([], dtype=object)})
+
+        assert get_instrument_positions(data, ['forma']) == []
+
+
+class TestInstrumentMask:
+    """Test selecting the rows of one instrument by its key"""
+
+    @pytest.fixture
+    def categorization(self):
+        """Two instrument variables, keyed as 'anio:...|forma:...'"""
+        return VariableCategorization(
+            instrument_vars=['forma', 'anio'],
+            item_id_vars=[],
+            metadata_vars=[],
+            classification_vars=[],
+            other_vars=[]
+        )
+
+    def test_matches_instrument_indices(self, categorization):
+        """Every key selects the same rows as the full grouping"""
+        data = pd.DataFrame({
+            'forma': pd.Series([None, np.nan, 'A', 'A|anio:1', 'B:C', 1, '1'], dtype=object),
+            'anio': pd.Series(['1', '1', '1|anio:1', '1', 2020, 2020, '2020'], dtype=object)
+        })
+
+        for key, positions in instrument_indices(data, categorization).items():
+            assert np.flatnonzero(instrument_mask(data, categorization, key)).tolist() == positions.tolist()
+
+    def test_separators_inside_values(self, categorization):
+        """Values holding ':' or '|' do not shift the match to another variable"""
+        data = pd.DataFrame({'forma': ['A|anio:1', 'A'], 'anio': ['1', '1|anio:1']})
+
+        assert instrument_mask(data, categorization, 'anio:1|forma:A|anio:1').tolist() == [True, False]
+        assert instrument_mask(data, categorization, 'anio:1|anio:1|forma:A').tolist() == [False, True]
+
+    def test_unknown_key_selects_nothing(self, categorization):
+        """A key that names no instrument has no rows"""
+        data = pd.DataFrame({'forma': ['A', 'B'], 'anio': [2020, 2021]})
+
+        assert not instrument_mask(data, categorization, 'anio:2020|forma:B').any()
+        assert not instrument_mask(data, categorization, 'forma:A').any()
+
+
+class TestReportInstrumentCounts:
+    """Test that the report summary and every check see the same instruments"""
+
+    @pytest.fixture
+    def data_with_blank_instruments(self):
+        """Instrument column with None, NaN, NaT and their text lookalikes"""
+        return pd.DataFrame({
+            'forma': pd.Series([None, np.nan, pd.NaT, 'None', 'nan', 'A', 'A'], dtype=object),
+            'id_item': ['i1', 'i2', 'i3', 'i4', 'i5', 'i6', 'i6'],
+            'clave': ['A', 'B', 'C', 'D', None, 'A', 'B'],
+            'eje': ['x', 'y', 'x', 'y', 'x', 'y', 'x']
+        })
+
+    def test_summary_matches_checks(self, data_with_blank_instruments):
+        """summary.total_instruments agrees with the instrument, ID, metadata and classification checks"""
+        categorization = VariableCategorization(
+            instrument_vars=['forma'],
+            item_id_vars=['id_item'],
+            metadata_vars=['clave'],
+            classification_vars=['eje'],
+            other_vars=[]
+        )
+
+        report = EnsamblajeValidator().generate_comprehensive_report(data_with_blank_instruments, categorization)
+
+        expected_keys = ['forma:None', 'forma:nan', 'forma:NaT', 'forma:A']
+        assert report.summary.total_instruments == 4
+        assert report.instrument_validation.instrument_summary['total_instruments'] == 4
+        assert list(report.duplicate_validation.statistics['instruments_analysis']) == expected_keys
+        assert list(report.metadata_validation.statistics['instruments_analysis']) == expected_keys
+        assert list(report.classification_validation.unique_counts_per_instrument) == expected_keys
+        assert {
+            key: detail['observations_count']
+            for key, detail in report.instrument_validation.instruments_detail.items()
+        } == {'forma:None': 2, 'forma:nan': 2, 'forma:NaT': 1, 'forma:A': 2}
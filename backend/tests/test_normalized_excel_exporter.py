@@ -0,0 +1,90 @@
+"""
+Tests for the normalized data Excel export
+"""
+import os
+import pytest
+import numpy as np
+import pandas as pd
+from app.core.models import VariableCategorization
+from app.tools.ensamblaje_tool.export_formats import normalized_excel_exporter
+from app.tools.ensamblaje_tool.export_formats.normalized_excel_exporter import NormalizedExcelExporter
+
+class _ExportRecords:
+    """Stand-in for the database manager: keeps the export records in memory"""
+
+    def __init__(self):
+        self.records = []
+
+    def create_export_record(self, **record):
+        self.records.append(record)
+        return len(self.records)
+
+class TestNormalizedExcelExport:
+    """Test the export written through xlsxwriter"""
+
+    @pytest.fixture
+    def data(self):
+        """Items with text IDs, numbers, blanks and a URL-like text"""
+        return pd.DataFrame({
+            'Mi_instrumento': ['Instrumento1', 'Instrumento1', 'Instrumento2'],
+            'Mis_items': ['001', '002', '003'],
+            'las_claves': ['A', np.nan, 'C'],
+            'puntaje': [1.5, np.nan, 3.0],
+            'el_texto_del_item': ['¿Capital de Chile?', 'https://ejemplo.cl/item', '¿2+2?']
+        })
+
+    @pytest.fixture
+    def categorization(self):
+        return VariableCategorization(
+            instrument_vars=['Mi_instrumento'],
+            item_id_vars=['Mis_items'],
+            metadata_vars=['las_claves'],
+            classification_vars=['el_texto_del_item'],
+            other_vars=['puntaje']
+        )
+
+    @pytest.fixture
+    def export_result(self, data, categorization, monkeypatch):
+        """Run the export and remove the file afterwards"""
+        records = _ExportRecords()
+        monkeypatch.setattr(NormalizedExcelExporter, '_get_db_manager', lambda self: records)
+
+        exporter = NormalizedExcelExporter('sesion')
+        create_writer = exporter._create_writer
+        engines = []
+
+        def record_engine(file_path):
+            writer = create_writer(file_path)
+            engines.append(writer.engine)
+            return writer
+
+        monkeypatch.setattr(exporter, '_create_writer', record_engine)
+
+        result = exporter.export(data, categorization, validation_session_id=1)
+        result['engines'] = engines
+        yield result
+        if result.get('file_path') and os.path.exists(result['file_path']):
+            os.remove(result['file_path'])
+
+    def test_written_with_xlsxwriter(self, export_result):
+        """xlsxwriter is installed and writes the workbook"""
+        assert normalized_excel_exporter.XLSXWRITER_AVAILABLE
+        assert export_result['success'], export_result.get('error')
+        assert export_result['engines'] == ['xlsxwriter']
+
+    def test_sheets_round_trip(self, export_result, data):
+        """Both sheets read back with the renamed columns and the original values"""
+        sheets = pd.read_excel(export_result['file_path'], sheet_name=None, dtype={'id_item1': str})
+
+        expected = data.rename(columns={
+            'Mi_instrumento': 'var_instrumento1',
+            'Mis_items': 'id_item1',
+            'las_claves': 'var_metadata1',
+            'el_texto_del_item': 'var_clasificacion1',
+            'puntaje': 'var_otra1'
+        })
+        assert list(sheets) == ['Datos_Normalizados', 'Mapeo_Variables']
+        pd.testing.assert_frame_equal(sheets['Datos_Normalizados'], expected)
+        assert sheets['Mapeo_Variables']['Variable_Normalizada'].tolist() == [
+            'var_instrumento1', 'id_item1', 'var_metadata1', 'var_clasificacion1', 'var_otra1'
+        ]
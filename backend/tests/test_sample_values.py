@@ -0,0 +1,23 @@
+"""
+Tests for the sample values shown for each column after upload
+"""
+import pandas as pd
+from app.core.services.file_service import FileUploadService
+
+def _sample_values(series: pd.Series):
+    return FileUploadService._get_sample_values(FileUploadService.__new__(FileUploadService), series)
+
+class TestSampleValues:
+    """Test the first distinct values of a column, as strings"""
+
+    def test_equal_values_with_different_text(self):
+        """1, '1' and 1.0 are deduplicated by their text, not by equality"""
+        series = pd.Series([1, '1', 1.0, None, 'x', 2, 'y', 'z'], dtype=object)
+
+        assert _sample_values(series) == ['1', '1.0', 'x', '2', 'y']
+
+    def test_scans_past_the_head(self):
+        """A head with fewer distinct values than the limit falls back to the whole column"""
+        series = pd.Series(['A'] * FileUploadService.SAMPLE_SCAN_ROWS + [1, '1', 1.0, 'B', None, 'C'], dtype=object)
+
+        assert _sample_values(series) == ['A', '1', '1.0', 'B', 'C']
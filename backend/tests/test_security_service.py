@@ -0,0 +1,92 @@
+"""
+Tests for the file security validator (macro detection in xlsx files)
+"""
+import pytest
+import zipfile
+from io import BytesIO
+import pandas as pd
+from app.core.services.security_service import FileSecurityValidator
+
+XLSX_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+def _xlsx_bytes(with_macros: bool) -> bytes:
+    """Workbook written by pandas, optionally with a VBA project added to the archive"""
+    buffer = BytesIO()
+    pd.DataFrame({'item': ['i1', 'i2'], 'clave': ['A', 'B']}).to_excel(buffer, index=False)
+    if with_macros:
+        with zipfile.ZipFile(buffer, 'a') as zip_file:
+            zip_file.writestr('xl/vbaProject.bin', b'\x00' * 64)
+    return buffer.getvalue()
+
+class TestMacroScan:
+    """Test that xlsx member names are read the same way zipfile reads them"""
+
+    @pytest.fixture
+    def validator(self):
+        """Create validator instance"""
+        return FileSecurityValidator()
+
+    @pytest.fixture
+    def write_xlsx(self, tmp_path):
+        """Write xlsx bytes to a file and return its path"""
+        def write(content: bytes) -> str:
+            file_path = tmp_path / 'libro.xlsx'
+            file_path.write_bytes(content)
+            return str(file_path)
+        return write
+
+    def test_clean_xlsx(self, validator, write_xlsx):
+        """A plain workbook has no macros"""
+        file_path = write_xlsx(_xlsx_bytes(with_macros=False))
+
+        scan = validator._scan_for_macros(file_path, XLSX_MIME_TYPE)
+
+        assert scan['has_macros'] is False
+        assert scan['error'] is None
+        assert validator.validate_file_comprehensive(file_path).is_safe
+
+    def test_macro_xlsx(self, validator, write_xlsx):
+        """A VBA project in the archive is reported and the file is rejected"""
+        file_path = write_xlsx(_xlsx_bytes(with_macros=True))
+
+        scan = validator._scan_for_macros(file_path, XLSX_MIME_TYPE)
+
+        assert scan['has_macros'] is True
+        assert scan['macro_files_found'] == ['xl/vbaProject.bin']
+        assert not validator.validate_file_comprehensive(file_path).is_safe
+
+    def test_prefixed_macro_xlsx(self, validator, write_xlsx):
+        """Data prepended to the archive does not hide the VBA project (zipfile still opens it)"""
+        file_path = write_xlsx(b'\x00' * 64 + _xlsx_bytes(with_macros=True))
+        with zipfile.ZipFile(file_path) as zip_file:
+            expected_names = zip_file.namelist()
+
+        scan = validator._scan_for_macros(file_path, XLSX_MIME_TYPE)
+
+        assert validator._read_zip_member_names(file_path) == expected_names
+        assert scan['has_macros'] is True
+        assert scan['error'] is None
+        assert not validator.validate_file_comprehensive(file_path).is_safe
+
+    def test_entry_count_is_not_trusted(self, validator, write_xlsx):
+        """An End Of Central Directory entry count of 1 still lists every member"""
+        content = bytearray(_xlsx_bytes(with_macros=True))
+        eocd_pos = content.rfind(FileSecurityValidator.ZIP_EOCD_SIGNATURE)
+        content[eocd_pos + 8:eocd_pos + 12] = b'\x01\x00\x01\x00'
+        file_path = write_xlsx(bytes(content))
+
+        assert 'xl/vbaProject.bin' in validator._read_zip_member_names(file_path)
+
+
+class TestContentScan:
+    """Test the suspicious pattern scan on file content"""
+
+    def test_patterns_reported_in_list_order(self, tmp_path):
+        """Every pattern found is reported once, in SUSPICIOUS_PATTERNS order"""
+        file_path = tmp_path / 'datos.csv'
+        file_path.write_bytes(b'item,texto\ni1,<script>cmd.exe</script>\ni2,<script>\n')
+
+        scan = FileSecurityValidator()._scan_file_content(str(file_path))
+
+        assert scan['patterns_detected'] == ['<script', 'cmd.exe']
+        assert scan['suspicious_patterns_found'] == 2